@@ -1,13 +1,54 @@
 """Utilities for generating narrative insights via OpenAI-compatible APIs."""
 from __future__ import annotations
 
+import asyncio
+import atexit
+import hashlib
+import math
+import random
+import threading
+import time
 from dataclasses import dataclass
-from typing import Literal, Mapping, Sequence
+from operator import itemgetter
+from typing import Callable, Literal, Mapping, Sequence
 
 import httpx
 
+from . import serialization
+
+try:  # pragma: no cover - optional dependency
+    import h2  # noqa: F401  - httpx only needs it to be importable
+except ImportError:  # pragma: no cover - optional dependency
+    HTTP2_AVAILABLE = False
+else:  # pragma: no cover - optional dependency
+    HTTP2_AVAILABLE = True
+
 AIRequestMode = Literal["chat_completions", "responses"]
 
+DEFAULT_PROMPT = (
+    "You are an FP&A analyst. Review the variance report data, highlight major "
+    "drivers and noteworthy patterns, and suggest follow-up questions for the "
+    "finance team."
+)
+SYSTEM_TEXT = (
+    "You provide concise but detailed narrative insights about financial "
+    "performance based on tabular data."
+)
+
+RESPONSE_CACHE_SIZE = 1024
+_response_cache: dict[str, str] = {}
+_RESPONSE_CACHE_LOCK = threading.Lock()
+
+RETRY_MAX_DELAY = 30.0
+
+_CLIENT_LIMITS = httpx.Limits(
+    max_connections=100,
+    max_keepalive_connections=40,
+    keepalive_expiry=30.0,
+)
+_CLIENTS: dict[tuple[str, float], httpx.Client] = {}
+_CLIENTS_LOCK = threading.Lock()
+
 
 @dataclass(frozen=True)
 class AIConfig:
@@ -18,6 +59,8 @@ class AIConfig:
     api_base: str = "https://api.openai.com/v1"
     timeout: float = 30.0
     mode: AIRequestMode = "chat_completions"
+    max_retries: int = 3
+    retry_backoff: float = 0.5
 
     def headers(self) -> dict[str, str]:
         headers: dict[str, str] = {"Content-Type": "application/json"}
@@ -26,50 +69,156 @@ class AIConfig:
         return headers
 
 
+def _row_getter(keys: Sequence[str]) -> Callable[[Mapping[str, object]], tuple[object, ...]]:
+    if len(keys) > 1:
+        return itemgetter(*keys)
+    single = itemgetter(keys[0])
+    return lambda item: (single(item),)
+
+
+VARIANCE_COLUMNS = ("period", "department", "account", "actual", "budget", "variance")
+KNOWN_SCHEMAS: dict[frozenset[str], tuple[str, ...]] = {
+    frozenset(VARIANCE_COLUMNS): VARIANCE_COLUMNS,
+}
+# Header text and accessor per known schema, built once at import time.
+_KNOWN_FORMATTERS = {
+    schema: (columns, ",".join(columns), _row_getter(columns))
+    for schema, columns in KNOWN_SCHEMAS.items()
+}
+
+
+def _get_client(base_url: str, timeout: float) -> httpx.Client:
+    """Return a pooled client so repeat calls reuse keep-alive connections.
+
+    Clients are keyed by endpoint and timeout only: the API key travels in
+    per-request headers, so callers with different keys share connections.
+    """
+    key = (base_url, timeout)
+    client = _CLIENTS.get(key)
+    if client is None:
+        with _CLIENTS_LOCK:
+            client = _CLIENTS.get(key)
+            if client is None:
+                client = httpx.Client(
+                    base_url=base_url,
+                    timeout=timeout,
+                    limits=_CLIENT_LIMITS,
+                    http2=HTTP2_AVAILABLE,
+                )
+                _CLIENTS[key] = client
+    return client
+
+
+def close_clients() -> None:
+    """Close every pooled HTTP client created by :func:`generate_insights`."""
+    with _CLIENTS_LOCK:
+        clients = list(_CLIENTS.values())
+        _CLIENTS.clear()
+    for client in clients:
+        client.close()
+
+
+atexit.register(close_clients)
+
+
 def _format_records(records: Sequence[Mapping[str, object]]) -> str:
     if not records:
         return "No financial data was provided."
 
-    keys = list(records[0].keys())
-    header = ",".join(keys)
-    lines = [header]
-    for item in records:
-        row = []
-        for key in keys:
-            value = item.get(key, "")
-            row.append(str(value))
-        lines.append(",".join(row))
-    return "\n".join(lines)
+    known = _KNOWN_FORMATTERS.get(frozenset(records[0]))
+    if known is not None:
+        keys, header, getter = known
+    else:
+        keys = tuple(records[0].keys())
+        header = ",".join(keys)
+        if not keys:
+            return header + "\n" * len(records)
+        getter = _row_getter(keys)
+
+    try:
+        body = "\n".join(",".join(map(str, getter(item))) for item in records)
+    except KeyError:
+        # Records with missing keys fall back to per-key lookups with blanks.
+        body = "\n".join(
+            ",".join(str(item.get(key, "")) for key in keys) for item in records
+        )
+    return f"{header}\n{body}"
 
 
-def generate_insights(
+def _build_messages(
+    records: Sequence[Mapping[str, object]],
+    prompt: str | None,
+) -> tuple[str, str]:
+    if prompt is None:
+        prompt = DEFAULT_PROMPT
+    dataset = _format_records(records)
+    return SYSTEM_TEXT, f"{prompt}\n\nVariance data (CSV):\n{dataset}"
+
+
+def _prompt_hash(config: AIConfig, system_text: str, user_text: str) -> str:
+    # The endpoint is part of the key: the same model name on another
+    # provider or deployment must not reuse stored insights.
+    api_base = config.api_base.rstrip("/")
+    key = f"{api_base}|{config.model}|{config.mode}|{system_text}|{user_text}"
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest()
+
+
+@dataclass(frozen=True)
+class PreparedInsights:
+    """Prompt messages and cache key for one insights request, built once."""
+
+    system_text: str
+    user_text: str
+    cache_key: str
+
+
+def prepare_insights(
+    records: Sequence[Mapping[str, object]],
+    config: AIConfig,
+    *,
+    prompt: str | None = None,
+) -> PreparedInsights:
+    """Build the messages ``generate_insights`` would send, plus their cache key.
+
+    Callers that look the key up elsewhere first pass the result back through
+    ``prepared=`` so the CSV prompt is not formatted and hashed a second time.
+    """
+    system_text, user_text = _build_messages(records, prompt)
+    return PreparedInsights(system_text, user_text, _prompt_hash(config, system_text, user_text))
+
+
+def insights_cache_key(
     records: Sequence[Mapping[str, object]],
     config: AIConfig,
     *,
     prompt: str | None = None,
-    client: httpx.Client | None = None,
 ) -> str:
-    """Send scenario data to an OpenAI-compatible endpoint and return insights."""
-    if not config.api_key:
-        raise ValueError("An API key is required to request AI insights.")
+    """Return the stable hash identifying the request ``generate_insights`` would send."""
+    return prepare_insights(records, config, prompt=prompt).cache_key
 
-    if prompt is None:
-        prompt = (
-            "You are an FP&A analyst. Review the variance report data, highlight major "
-            "drivers and noteworthy patterns, and suggest follow-up questions for the "
-            "finance team."
-        )
 
-    dataset = _format_records(records)
-    system_text = (
-        "You provide concise but detailed narrative insights about financial "
-        "performance based on tabular data."
-    )
-    user_text = f"{prompt}\n\nVariance data (CSV):\n{dataset}"
+def _remember_response(key: str, content: str) -> None:
+    # Bridge worker threads share the cache, so eviction and insert are atomic.
+    with _RESPONSE_CACHE_LOCK:
+        if key not in _response_cache and len(_response_cache) >= RESPONSE_CACHE_SIZE:
+            # Dicts preserve insertion order, so the first key is the oldest entry.
+            del _response_cache[next(iter(_response_cache))]
+        _response_cache[key] = content
+
+
+def clear_response_cache() -> None:
+    """Drop every response memoised by :func:`generate_insights`."""
+    with _RESPONSE_CACHE_LOCK:
+        _response_cache.clear()
 
+
+def _build_request(
+    config: AIConfig,
+    system_text: str,
+    user_text: str,
+) -> tuple[str, dict[str, object]]:
     if config.mode == "responses":
-        path = "/responses"
-        payload = {
+        return "/responses", {
             "model": config.model,
             "input": [
                 {
@@ -82,27 +231,17 @@ def generate_insights(
                 },
             ],
         }
-    else:
-        path = "/chat/completions"
-        payload = {
-            "model": config.model,
-            "messages": [
-                {"role": "system", "content": system_text},
-                {"role": "user", "content": user_text},
-            ],
-        }
+    return "/chat/completions", {
+        "model": config.model,
+        "messages": [
+            {"role": "system", "content": system_text},
+            {"role": "user", "content": user_text},
+        ],
+    }
 
-    if client is None:
-        base_url = config.api_base.rstrip("/")
-        with httpx.Client(base_url=base_url, timeout=config.timeout) as http_client:
-            response = http_client.post(path, json=payload, headers=config.headers())
-    else:
-        response = client.post(path, json=payload, headers=config.headers())
-
-    response.raise_for_status()
-    data = response.json()
 
-    if config.mode == "responses":
+def _parse_response(data: dict, mode: AIRequestMode) -> str:
+    if mode == "responses":
         content: str | None = None
         try:
             choice = data["choices"][0]
@@ -139,3 +278,161 @@ def generate_insights(
         raise RuntimeError("AI response did not contain textual content")
 
     return content.strip()
+
+
+def _is_retryable(status_code: int) -> bool:
+    return status_code == 429 or status_code >= 500
+
+
+def _retry_delay(attempt: int, base: float, response: httpx.Response | None) -> float:
+    delay = base * (2**attempt) + random.uniform(0, base)
+    if response is not None:
+        retry_after = response.headers.get("Retry-After")
+        if retry_after:
+            try:
+                requested = float(retry_after)
+            except ValueError:
+                pass  # HTTP-date values fall back to the computed backoff.
+            else:
+                if math.isfinite(requested):
+                    delay = max(0.0, requested)
+    return min(delay, RETRY_MAX_DELAY)
+
+
+def _post_with_retry(
+    client: httpx.Client,
+    path: str,
+    payload: dict[str, object],
+    config: AIConfig,
+) -> httpx.Response:
+    """POST ``payload``, retrying 429/5xx responses and transport errors."""
+    tries = max(config.max_retries, 0) + 1
+    body = serialization.dumps(payload)
+    for attempt in range(tries):
+        last_attempt = attempt == tries - 1
+        try:
+            response = client.post(path, content=body, headers=config.headers())
+        except httpx.TransportError:
+            if last_attempt:
+                raise
+            time.sleep(_retry_delay(attempt, config.retry_backoff, None))
+            continue
+        if last_attempt or not _is_retryable(response.status_code):
+            return response
+        time.sleep(_retry_delay(attempt, config.retry_backoff, response))
+    raise AssertionError("unreachable")  # pragma: no cover
+
+
+async def _post_with_retry_async(
+    client: httpx.AsyncClient,
+    path: str,
+    payload: dict[str, object],
+    config: AIConfig,
+) -> httpx.Response:
+    tries = max(config.max_retries, 0) + 1
+    body = serialization.dumps(payload)
+    for attempt in range(tries):
+        last_attempt = attempt == tries - 1
+        try:
+            response = await client.post(path, content=body, headers=config.headers())
+        except httpx.TransportError:
+            if last_attempt:
+                raise
+            await asyncio.sleep(_retry_delay(attempt, config.retry_backoff, None))
+            continue
+        if last_attempt or not _is_retryable(response.status_code):
+            return response
+        await asyncio.sleep(_retry_delay(attempt, config.retry_backoff, response))
+    raise AssertionError("unreachable")  # pragma: no cover
+
+
+def generate_insights(
+    records: Sequence[Mapping[str, object]],
+    config: AIConfig,
+    *,
+    prompt: str | None = None,
+    client: httpx.Client | None = None,
+    prepared: PreparedInsights | None = None,
+) -> str:
+    """Send scenario data to an OpenAI-compatible endpoint and return insights.
+
+    Responses are memoised in-process by a hash of the model, mode and prompt
+    text, so identical requests are answered without a network round-trip.
+    Rate-limited (429) and 5xx responses are retried with exponential backoff
+    up to ``config.max_retries`` times. ``prepared`` reuses the output of
+    :func:`prepare_insights` for these same ``records`` and ``prompt``.
+    """
+    if not config.api_key:
+        raise ValueError("An API key is required to request AI insights.")
+
+    if prepared is None:
+        prepared = prepare_insights(records, config, prompt=prompt)
+    cached = _response_cache.get(prepared.cache_key)
+    if cached is not None:
+        return cached
+
+    path, payload = _build_request(config, prepared.system_text, prepared.user_text)
+    if client is None:
+        client = _get_client(config.api_base.rstrip("/"), config.timeout)
+    response = _post_with_retry(client, path, payload, config)
+
+    response.raise_for_status()
+    content = _parse_response(response.json(), config.mode)
+    _remember_response(prepared.cache_key, content)
+    return content
+
+
+async def generate_insights_async(
+    records: Sequence[Mapping[str, object]],
+    config: AIConfig,
+    *,
+    prompt: str | None = None,
+    client: httpx.AsyncClient,
+    prepared: PreparedInsights | None = None,
+) -> str:
+    """Asynchronous counterpart of :func:`generate_insights` for a shared client."""
+    if not config.api_key:
+        raise ValueError("An API key is required to request AI insights.")
+
+    if prepared is None:
+        prepared = prepare_insights(records, config, prompt=prompt)
+    cached = _response_cache.get(prepared.cache_key)
+    if cached is not None:
+        return cached
+
+    path, payload = _build_request(config, prepared.system_text, prepared.user_text)
+    response = await _post_with_retry_async(client, path, payload, config)
+
+    response.raise_for_status()
+    content = _parse_response(response.json(), config.mode)
+    _remember_response(prepared.cache_key, content)
+    return content
+
+
+async def generate_insights_many(
+    batches: Sequence[Sequence[Mapping[str, object]]],
+    config: AIConfig,
+    *,
+    prompt: str | None = None,
+    client: httpx.AsyncClient | None = None,
+) -> list[str]:
+    """Request insights for several datasets concurrently, preserving order."""
+    if client is not None:
+        return list(
+            await asyncio.gather(
+                *(
+                    generate_insights_async(batch, config, prompt=prompt, client=client)
+                    for batch in batches
+                )
+            )
+        )
+
+    async with httpx.AsyncClient(
+        base_url=config.api_base.rstrip("/"),
+        timeout=config.timeout,
+        limits=_CLIENT_LIMITS,
+        http2=HTTP2_AVAILABLE,
+    ) as http_client:
+        return await generate_insights_many(
+            batches, config, prompt=prompt, client=http_client
+        )
@@ -1,7 +1,11 @@
 """Database helpers for the datarails-open MVP."""
 from __future__ import annotations
 
+import os
 import sqlite3
+import threading
+from functools import lru_cache
+from itertools import chain, islice
 from pathlib import Path
 from typing import Iterable
 
@@ -24,6 +28,23 @@ CREATE INDEX IF NOT EXISTS idx_financial_facts_department
     ON financial_facts(department);
 """
 
+DEFAULT_CHUNK_SIZE = 10_000
+# Prepared statements kept per connection. Pooled bridge connections live for
+# the whole process, so identical SQL strings skip parsing and planning.
+STATEMENT_CACHE_SIZE = 256
+
+INSERT_FACT_SQL = """
+INSERT INTO financial_facts (
+    source, scenario, period, department, account, value, currency, metadata
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+FACT_COLUMNS = 8
+MULTI_ROW_CHUNK_SIZE = 500
+# SQLite's historical SQLITE_MAX_VARIABLE_NUMBER, used when the limit cannot
+# be queried (Connection.getlimit needs Python 3.11).
+DEFAULT_VARIABLE_LIMIT = 999
+
 SCHEMA_MIGRATIONS = """
 CREATE TABLE IF NOT EXISTS schema_migrations (
     name TEXT PRIMARY KEY,
@@ -49,14 +70,96 @@ MIGRATIONS: tuple[tuple[str, str], ...] = (
             ON ai_insights(created_at DESC);
         """,
     ),
+    (
+        "002_add_ai_insights_prompt_hash",
+        """
+        ALTER TABLE ai_insights ADD COLUMN prompt_hash TEXT;
+
+        CREATE INDEX IF NOT EXISTS idx_ai_insights_prompt_hash
+            ON ai_insights(prompt_hash);
+        """,
+    ),
+    (
+        "003_add_ai_insights_lookup_index",
+        """
+        CREATE INDEX IF NOT EXISTS idx_ai_insights_lookup
+            ON ai_insights(actual, budget, created_at DESC, id DESC, prompt);
+        """,
+    ),
+    (
+        "004_add_ai_insights_created_at_id_index",
+        """
+        CREATE INDEX IF NOT EXISTS idx_ai_insights_created_at_id
+            ON ai_insights(created_at DESC, id DESC);
+        """,
+    ),
+    (
+        "005_add_financial_facts_reporting_index",
+        """
+        CREATE INDEX IF NOT EXISTS idx_financial_facts_reporting
+            ON financial_facts(scenario, period, department, account, value);
+        """,
+    ),
 )
 
 
-def get_connection(db_path: Path | str) -> sqlite3.Connection:
-    """Return a SQLite connection with row factory enabled."""
-    path = Path(db_path)
-    conn = sqlite3.connect(path)
+# Helper threads SQLite may use for large sorts (GROUP BY/ORDER BY in reports);
+# SQLite's default compile-time ceiling is 8.
+SORTER_THREADS = min(os.cpu_count() or 2, 8)
+
+# journal_mode is stored in the database file, so it is set once per path;
+# the remaining pragmas only last for the connection that issues them.
+JOURNAL_MODE_PRAGMA = "PRAGMA journal_mode=WAL"
+CONNECTION_PRAGMAS: tuple[str, ...] = (
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-65536",
+    "PRAGMA mmap_size=268435456",
+    # Truncate the WAL back to 64 MiB after checkpoints so a bulk load does
+    # not leave a multi-gigabyte -wal file behind.
+    "PRAGMA journal_size_limit=67108864",
+    f"PRAGMA threads={SORTER_THREADS}",
+)
+
+_wal_paths: set[str] = set()
+_wal_lock = threading.Lock()
+
+
+def _ensure_wal(conn: sqlite3.Connection, path: Path | str) -> None:
+    key = str(path)
+    if key in _wal_paths:
+        return
+    with _wal_lock:
+        if key not in _wal_paths:
+            conn.execute(JOURNAL_MODE_PRAGMA)
+            _wal_paths.add(key)
+
+
+def get_connection(
+    db_path: Path | str,
+    *,
+    check_same_thread: bool = True,
+    uri: bool = False,
+) -> sqlite3.Connection:
+    """Return a SQLite connection with row factory enabled.
+
+    Connections use write-ahead logging with ``synchronous=NORMAL`` so bulk
+    loads fsync once per checkpoint rather than on every commit. Pass
+    ``check_same_thread=False`` only when callers hand the connection between
+    threads one at a time, as a connection pool does, and ``uri=True`` when
+    ``db_path`` is a ``file:`` URI such as a shared in-memory database.
+    """
+    path = db_path if uri else Path(db_path)
+    conn = sqlite3.connect(
+        path,
+        check_same_thread=check_same_thread,
+        cached_statements=STATEMENT_CACHE_SIZE,
+        uri=uri,
+    )
     conn.row_factory = sqlite3.Row
+    _ensure_wal(conn, path)
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
     return conn
 
 
@@ -64,6 +167,8 @@ def init_db(db_path: Path | str) -> None:
     """Initialise the SQLite database with the required tables."""
     conn = get_connection(db_path)
     try:
+        # A recreated file starts in rollback-journal mode, so always set WAL here.
+        conn.execute(JOURNAL_MODE_PRAGMA)
         conn.executescript(SCHEMA)
         conn.executescript(SCHEMA_MIGRATIONS)
         run_migrations(conn)
@@ -72,26 +177,92 @@ def init_db(db_path: Path | str) -> None:
         conn.close()
 
 
+def _begin_immediate(conn: sqlite3.Connection) -> None:
+    # Taking the write lock up front means a concurrent writer makes the load
+    # wait at BEGIN instead of failing with SQLITE_BUSY halfway through a batch.
+    if not conn.in_transaction:
+        conn.execute("BEGIN IMMEDIATE")
+
+
 def insert_rows(
     conn: sqlite3.Connection,
     rows: Iterable[tuple[str, str, str, str, str, float, str, str | None]],
 ) -> int:
     """Bulk insert rows into the financial_facts table.
 
-    Returns the number of inserted records.
+    Rows are streamed straight into ``executemany`` inside one transaction, so
+    iterables are never materialised here; callers loading millions of rows
+    should chunk the input themselves. Returns the number of inserted records.
     """
-    cursor = conn.executemany(
-        """
-        INSERT INTO financial_facts (
-            source, scenario, period, department, account, value, currency, metadata
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """,
-        list(rows),
-    )
-    conn.commit()
+    with conn:
+        _begin_immediate(conn)
+        cursor = conn.executemany(INSERT_FACT_SQL, rows)
     return cursor.rowcount
 
 
+def insert_rows_chunked(
+    conn: sqlite3.Connection,
+    rows: Iterable[tuple[str, str, str, str, str, float, str, str | None]],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> int:
+    """Insert rows in ``chunk_size`` batches within a single transaction.
+
+    Only one chunk is held in memory at a time. Returns the number of inserted
+    records.
+    """
+    iterator = iter(rows)
+    inserted = 0
+    with conn:
+        _begin_immediate(conn)
+        while True:
+            chunk = list(islice(iterator, chunk_size))
+            if not chunk:
+                break
+            inserted += conn.executemany(INSERT_FACT_SQL, chunk).rowcount
+    return inserted
+
+
+@lru_cache(maxsize=8)
+def _multi_row_insert_sql(row_count: int) -> str:
+    placeholders = "(" + ", ".join("?" * FACT_COLUMNS) + ")"
+    return (
+        "INSERT INTO financial_facts ("
+        "source, scenario, period, department, account, value, currency, metadata"
+        ") VALUES " + ", ".join([placeholders] * row_count)
+    )
+
+
+def bulk_insert_rows(
+    conn: sqlite3.Connection,
+    rows: Iterable[tuple[str, str, str, str, str, float, str, str | None]],
+    chunk_size: int = MULTI_ROW_CHUNK_SIZE,
+) -> int:
+    """Insert rows with multi-row ``VALUES`` statements inside one transaction.
+
+    Each statement carries up to ``chunk_size`` rows, capped so the bound
+    parameters stay within the connection's variable limit. This binds values
+    in fewer VM steps than ``executemany`` for large exports. Returns the
+    number of inserted records.
+    """
+    getlimit = getattr(conn, "getlimit", None)
+    variable_limit = (
+        getlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER) if getlimit else DEFAULT_VARIABLE_LIMIT
+    )
+    chunk_size = max(1, min(chunk_size, variable_limit // FACT_COLUMNS))
+    iterator = iter(rows)
+    inserted = 0
+    with conn:
+        _begin_immediate(conn)
+        while True:
+            chunk = list(islice(iterator, chunk_size))
+            if not chunk:
+                break
+            params = tuple(chain.from_iterable(chunk))
+            conn.execute(_multi_row_insert_sql(len(chunk)), params)
+            inserted += len(chunk)
+    return inserted
+
+
 def run_migrations(conn: sqlite3.Connection) -> None:
     """Apply outstanding migrations to the database."""
 
@@ -1,15 +1,55 @@
 """Excel ingestion helpers for the datarails-open MVP."""
 from __future__ import annotations
 
+import os
+import posixpath
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from itertools import chain
 from pathlib import Path
 from typing import Iterable, List, Sequence
+from xml.etree import ElementTree
 
 from openpyxl import load_workbook
 from openpyxl.utils import range_boundaries
 from openpyxl.worksheet.worksheet import Worksheet
 
 from . import database
-from .loader import LoadSummary, REQUIRED_COLUMNS, _normalise_row
+from .loader import (
+    LoadSummary,
+    REQUIRED_COLUMNS,
+    _STRIP_COMMAS,
+    _column_positions,
+)
+
+MAX_SHEET_WORKERS = 8
+
+_SHEET_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+_DOC_REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_PACKAGE_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+try:  # pragma: no cover - optional dependency
+    from python_calamine import CalamineWorkbook
+except ImportError:  # pragma: no cover - optional dependency
+    CalamineWorkbook = None
+
+
+def _text_column(cells: List[object]) -> List[str]:
+    return ["" if cell is None else str(cell).strip() for cell in cells]
+
+
+def _value_column(cells: List[object]) -> List[float]:
+    return [
+        float(cell)
+        if type(cell) is float or type(cell) is int
+        else float(("" if cell is None else str(cell)).translate(_STRIP_COMMAS))
+        for cell in cells
+    ]
+
+
+def _currency_column(cells: List[object]) -> List[str]:
+    return ["USD" if cell is None or cell == "" else str(cell).strip() for cell in cells]
 
 
 def _normalised_rows_from_iterable(
@@ -23,17 +63,36 @@ def _normalised_rows_from_iterable(
     if missing:
         raise ValueError(f"Missing required columns: {sorted(missing)}")
 
-    normalised: List[tuple[str, str, str, float, str, str]] = []
+    idx_map = _column_positions(headers)
+    width = len(headers)
+    # Cells are gathered column by column so each column is normalised in one
+    # tight loop below; optional columns that are absent stay as None runs.
+    cols: List[List[object]] = [[] for _ in idx_map]
+    appends = [(col.append, idx) for col, idx in zip(cols, idx_map) if idx is not None]
     for row in data_rows:
         if not any(cell not in (None, "") for cell in row):
             continue
-        as_dict = {
-            header: "" if value is None else str(value)
-            for header, value in zip(headers, row)
-            if header
-        }
-        normalised.append(_normalise_row(as_dict))
-    return normalised
+        if len(row) < width:
+            row = tuple(row) + (None,) * (width - len(row))
+        for append, idx in appends:
+            append(row[idx])
+
+    count = len(cols[0])
+    if not count:
+        return []
+    period, department, account, value, currency, metadata = (
+        col if idx is not None else [None] * count for col, idx in zip(cols, idx_map)
+    )
+    return list(
+        zip(
+            _text_column(period),
+            _text_column(department),
+            _text_column(account),
+            _value_column(value),
+            _currency_column(currency),
+            _text_column(metadata),
+        )
+    )
 
 
 def _rows_from_sheet(sheet: Worksheet) -> List[tuple[str, str, str, float, str, str]]:
@@ -46,9 +105,21 @@ def _rows_from_sheet(sheet: Worksheet) -> List[tuple[str, str, str, float, str,
     return _normalised_rows_from_iterable(header_row, rows_iter)
 
 
-def _rows_from_table(sheet: Worksheet, table_name: str) -> List[tuple[str, str, str, float, str, str]]:
-    table = sheet.tables[table_name]
-    min_col, min_row, max_col, max_row = range_boundaries(table.ref)
+def _rows_from_sheet_file(
+    path: Path,
+    sheet_name: str,
+) -> List[tuple[str, str, str, float, str, str]]:
+    # openpyxl workbooks are not safe to share between threads, so each worker
+    # streams its sheet through a workbook handle of its own.
+    workbook = load_workbook(path, data_only=True, read_only=True, keep_links=False)
+    try:
+        return _rows_from_sheet(workbook[sheet_name])
+    finally:
+        workbook.close()
+
+
+def _rows_from_table(sheet: Worksheet, ref: str) -> List[tuple[str, str, str, float, str, str]]:
+    min_col, min_row, max_col, max_row = range_boundaries(ref)
     rows_iter = sheet.iter_rows(
         min_row=min_row,
         max_row=max_row,
@@ -62,46 +133,146 @@ def _rows_from_table(sheet: Worksheet, table_name: str) -> List[tuple[str, str,
     return _normalised_rows_from_iterable(header_row, rows_iter)
 
 
+def _resolve_part(source: str, target: str) -> str:
+    if target.startswith("/"):
+        return target.lstrip("/")
+    return posixpath.normpath(posixpath.join(posixpath.dirname(source), target))
+
+
+def _relationships(archive: zipfile.ZipFile, part: str) -> dict[str, tuple[str, str]]:
+    rels_part = posixpath.join(posixpath.dirname(part), "_rels", posixpath.basename(part) + ".rels")
+    try:
+        root = ElementTree.fromstring(archive.read(rels_part))
+    except KeyError:
+        return {}
+    return {
+        rel.get("Id"): (rel.get("Type", ""), _resolve_part(part, rel.get("Target", "")))
+        for rel in root.iter(f"{{{_PACKAGE_REL_NS}}}Relationship")
+    }
+
+
+def _sheet_names(path: Path) -> List[str]:
+    """Return the worksheet titles listed in the workbook package, in order."""
+    with zipfile.ZipFile(path) as archive:
+        workbook_xml = ElementTree.fromstring(archive.read("xl/workbook.xml"))
+    return [sheet.get("name") for sheet in workbook_xml.iter(f"{{{_SHEET_NS}}}sheet")]
+
+
+def _table_refs(path: Path) -> dict[str, tuple[str, str]]:
+    """Map each table name to its worksheet title and cell range.
+
+    Read-only openpyxl worksheets do not expose table definitions, so they are
+    read straight from the workbook package instead of loading every cell.
+    """
+    refs: dict[str, tuple[str, str]] = {}
+    with zipfile.ZipFile(path) as archive:
+        workbook_part = "xl/workbook.xml"
+        sheet_parts = _relationships(archive, workbook_part)
+        workbook_xml = ElementTree.fromstring(archive.read(workbook_part))
+        for sheet in workbook_xml.iter(f"{{{_SHEET_NS}}}sheet"):
+            _, sheet_part = sheet_parts.get(sheet.get(f"{{{_DOC_REL_NS}}}id"), ("", ""))
+            if not sheet_part:
+                continue
+            for rel_type, table_part in _relationships(archive, sheet_part).values():
+                if not rel_type.endswith("/table"):
+                    continue
+                table = ElementTree.fromstring(archive.read(table_part))
+                name = table.get("name") or table.get("displayName")
+                refs[name] = (sheet.get("name"), table.get("ref"))
+    return refs
+
+
+def _calamine_cell(value: object) -> object:
+    # Match openpyxl's cell values so both readers produce identical rows.
+    if value == "":
+        return None
+    if type(value) is float and value.is_integer():
+        return int(value)
+    if type(value) is date:
+        return datetime(value.year, value.month, value.day)
+    return value
+
+
+def _rows_from_calamine(
+    path: Path,
+    sheets: Sequence[str] | None,
+) -> List[tuple[str, str, str, float, str, str]]:
+    workbook = CalamineWorkbook.from_path(str(path))
+    try:
+        requested_sheets = list(sheets) if sheets else workbook.sheet_names
+        for sheet_name in requested_sheets:
+            if sheet_name not in workbook.sheet_names:
+                raise ValueError(f"Worksheet '{sheet_name}' not found in workbook")
+
+        normalised_rows: List[tuple[str, str, str, float, str, str]] = []
+        for sheet_name in requested_sheets:
+            values = workbook.get_sheet_by_name(sheet_name).to_python(skip_empty_area=True)
+            rows_iter = (tuple(map(_calamine_cell, row)) for row in values)
+            for header_row in rows_iter:
+                if any(cell is not None for cell in header_row):
+                    break
+            else:
+                continue
+            normalised_rows.extend(_normalised_rows_from_iterable(header_row, rows_iter))
+        return normalised_rows
+    finally:
+        workbook.close()
+
+
 def read_workbook(
     path: Path | str,
     *,
     sheets: Sequence[str] | None = None,
     tables: Sequence[str] | None = None,
 ) -> List[tuple[str, str, str, float, str, str]]:
-    """Read an Excel workbook and return normalised tuples ready for insertion."""
+    """Read an Excel workbook and return normalised tuples ready for insertion.
+
+    Worksheets are parsed with ``python-calamine`` when it is installed. Table
+    ranges are read from the workbook package and streamed with read-only
+    openpyxl, because calamine does not expose table definitions.
+    """
     path = Path(path)
     if not path.exists():
         raise FileNotFoundError(path)
     if path.suffix.lower() not in {".xlsx"}:
         raise ValueError("Only .xlsx files are supported by the Excel loader")
 
-    workbook = load_workbook(path, data_only=True)
-    try:
-        requested_sheets = list(sheets) if sheets else workbook.sheetnames
-        for sheet_name in requested_sheets:
-            if sheet_name not in workbook.sheetnames:
-                raise ValueError(f"Worksheet '{sheet_name}' not found in workbook")
+    if not tables and CalamineWorkbook is not None:
+        return _rows_from_calamine(path, sheets)
 
-        table_index = {
-            name: ws
-            for ws in workbook.worksheets
-            for name in ws.tables
-        }
-        if tables:
-            for table_name in tables:
-                if table_name not in table_index:
-                    raise ValueError(f"Table '{table_name}' not found in workbook")
+    sheet_names = _sheet_names(path)
+    requested_sheets = list(sheets) if sheets else sheet_names
+    for sheet_name in requested_sheets:
+        if sheet_name not in sheet_names:
+            raise ValueError(f"Worksheet '{sheet_name}' not found in workbook")
+    table_index = _table_refs(path) if tables else {}
+    for table_name in tables or ():
+        if table_name not in table_index:
+            raise ValueError(f"Table '{table_name}' not found in workbook")
 
+    if not tables and len(requested_sheets) > 1:
+        # Sheets are decoded concurrently, one workbook handle per task;
+        # map() preserves sheet order so the output stays deterministic.
+        workers = min(MAX_SHEET_WORKERS, len(requested_sheets), os.cpu_count() or 1)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(
+                lambda name: _rows_from_sheet_file(path, name),
+                requested_sheets,
+            )
+            return list(chain.from_iterable(results))
+
+    workbook = load_workbook(path, data_only=True, read_only=True, keep_links=False)
+    try:
         normalised_rows: List[tuple[str, str, str, float, str, str]] = []
         if tables:
             for table_name in tables:
-                ws = table_index[table_name]
-                if sheets and ws.title not in sheets:
+                sheet_title, ref = table_index[table_name]
+                if sheets and sheet_title not in sheets:
                     raise ValueError(
-                        f"Table '{table_name}' is located on worksheet '{ws.title}', "
+                        f"Table '{table_name}' is located on worksheet '{sheet_title}', "
                         "which is not in the selected sheets",
                     )
-                normalised_rows.extend(_rows_from_table(ws, table_name))
+                normalised_rows.extend(_rows_from_table(workbook[sheet_title], ref))
         else:
             for sheet_name in requested_sheets:
                 sheet = workbook[sheet_name]
@@ -119,11 +290,10 @@ def load_workbook_file(
     scenario: str,
     sheets: Sequence[str] | None = None,
     tables: Sequence[str] | None = None,
+    batch_size: int = database.DEFAULT_CHUNK_SIZE,
 ) -> LoadSummary:
     rows = read_workbook(path, sheets=sheets, tables=tables)
-    payload = [
-        (source, scenario, period, department, account, value, currency, metadata)
-        for period, department, account, value, currency, metadata in rows
-    ]
-    inserted = database.insert_rows(conn, payload)
+    prefix = (source, scenario)
+    payload = (prefix + row for row in rows)
+    inserted = database.insert_rows_chunked(conn, payload, chunk_size=batch_size)
     return LoadSummary(rows_loaded=inserted, source=source, scenario=scenario)
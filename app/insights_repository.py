@@ -6,6 +6,30 @@ from sqlite3 import Connection
 from typing import List, Optional, Tuple
 
 
+def _build_list_sql(bits: int) -> Tuple[str, str]:
+    clauses: List[str] = []
+    if bits & 1:
+        clauses.append("actual = ?")
+    if bits & 2:
+        clauses.append("budget = ?")
+    if bits & 4:
+        clauses.append("COALESCE(prompt, '') LIKE ?")
+    where_sql = " WHERE " + " AND ".join(clauses) if clauses else ""
+    page_sql = f"""
+        SELECT id, actual, budget, prompt, insights, row_count, created_at,
+            (SELECT COUNT(*) FROM ai_insights{where_sql}) AS total
+        FROM ai_insights{where_sql}
+        ORDER BY created_at DESC, id DESC
+        LIMIT ? OFFSET ?
+        """
+    count_sql = f"SELECT COUNT(*) AS count FROM ai_insights{where_sql}"
+    return page_sql, count_sql
+
+
+# Page and count statements keyed by which of (actual, budget, prompt) are set.
+_LIST_SQL = {bits: _build_list_sql(bits) for bits in range(8)}
+
+
 @dataclass(slots=True)
 class InsightRecord:
     """Simple representation of an insight stored in the database."""
@@ -33,19 +57,34 @@ class InsightsRepository:
         prompt: Optional[str],
         insights: str,
         row_count: int,
+        prompt_hash: Optional[str] = None,
     ) -> int:
         """Persist a new insight and return its identifier."""
 
         cursor = self._conn.execute(
             """
-            INSERT INTO ai_insights (actual, budget, prompt, insights, row_count)
-            VALUES (?, ?, ?, ?, ?)
+            INSERT INTO ai_insights (actual, budget, prompt, insights, row_count, prompt_hash)
+            VALUES (?, ?, ?, ?, ?, ?)
             """,
-            (actual, budget, prompt, insights, row_count),
+            (actual, budget, prompt, insights, row_count, prompt_hash),
         )
         self._conn.commit()
         return int(cursor.lastrowid)
 
+    def find_by_prompt_hash(self, prompt_hash: str) -> Optional[str]:
+        """Return the most recent insight text generated for ``prompt_hash``."""
+
+        row = self._conn.execute(
+            """
+            SELECT insights FROM ai_insights
+            WHERE prompt_hash = ?
+            ORDER BY id DESC
+            LIMIT 1
+            """,
+            (prompt_hash,),
+        ).fetchone()
+        return str(row["insights"]) if row else None
+
     def list(
         self,
         *,
@@ -57,38 +96,30 @@ class InsightsRepository:
     ) -> Tuple[List[InsightRecord], int]:
         """Return paginated insight records and the total count."""
 
-        where_clauses: List[str] = []
+        bits = bool(actual) | (bool(budget) << 1) | (bool(prompt) << 2)
+        page_sql, count_sql = _LIST_SQL[bits]
         params: List[object] = []
         if actual:
-            where_clauses.append("actual = ?")
             params.append(actual)
         if budget:
-            where_clauses.append("budget = ?")
             params.append(budget)
         if prompt:
-            where_clauses.append("COALESCE(prompt, '') LIKE ?")
             params.append(f"%{prompt}%")
 
-        where_sql = ""
-        if where_clauses:
-            where_sql = " WHERE " + " AND ".join(where_clauses)
-
-        total_row = self._conn.execute(
-            f"SELECT COUNT(*) AS count FROM ai_insights{where_sql}",
-            tuple(params),
-        ).fetchone()
-        total = int(total_row["count"] if total_row else 0)
-
         rows = self._conn.execute(
-            f"""
-            SELECT id, actual, budget, prompt, insights, row_count, created_at
-            FROM ai_insights{where_sql}
-            ORDER BY datetime(created_at) DESC, id DESC
-            LIMIT ? OFFSET ?
-            """,
-            (*params, limit, offset),
+            page_sql,
+            (*params, *params, limit, offset),
         ).fetchall()
 
+        if rows:
+            total = int(rows[0]["total"])
+        elif offset:
+            # Pages past the end return no rows to carry the total.
+            total_row = self._conn.execute(count_sql, tuple(params)).fetchone()
+            total = int(total_row["count"] if total_row else 0)
+        else:
+            total = 0
+
         records = [
             InsightRecord(
                 id=int(row["id"]),
@@ -1,12 +1,22 @@
-"""Data loading utilities using only the Python standard library."""
+"""CSV loading utilities built on the Python standard library."""
 from __future__ import annotations
 
 import csv
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Iterable, List, Tuple
+from typing import Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from . import database
 
 REQUIRED_COLUMNS = ["period", "department", "account", "value"]
+OUTPUT_COLUMNS = ["period", "department", "account", "value", "currency", "metadata"]
+
+# Removes thousands separators and spaces from numeric strings in one pass.
+_STRIP_COMMAS = str.maketrans("", "", ", ")
+
+# Files at least this large are parsed with pandas when it is installed; below
+# this size the import cost outweighs the vectorised parsing.
+PANDAS_MIN_BYTES = 1 << 20
 
 
 @dataclass
@@ -24,8 +34,7 @@ def _normalise_row(row: dict[str, str]) -> Tuple[str, str, str, float, str, str]
         period = row["period"].strip()
         department = row["department"].strip()
         account = row["account"].strip()
-        raw_value = row["value"].replace(",", "").strip()
-        value = float(raw_value)
+        value = float(row["value"].translate(_STRIP_COMMAS))
     except KeyError as exc:  # pragma: no cover - defensive branch
         raise ValueError(f"Missing column: {exc.args[0]}") from exc
 
@@ -34,8 +43,68 @@ def _normalise_row(row: dict[str, str]) -> Tuple[str, str, str, float, str, str]
     return period, department, account, value, currency, metadata
 
 
+def _read_dataset_pandas(pd, path: Path) -> List[Tuple[str, str, str, float, str, str]]:
+    # Headers come from the csv module and columns are selected by position,
+    # so duplicate headers and surplus fields resolve exactly as they do on the
+    # standard library path instead of pandas mangling or indexing them.
+    with path.open(newline="", encoding="utf-8") as fh:
+        headers = [h.strip().lower() for h in next(csv.reader(fh), [])]
+    if not headers:
+        return []
+    missing = set(REQUIRED_COLUMNS) - set(headers)
+    if missing:
+        raise ValueError(f"Missing required columns: {sorted(missing)}")
+
+    positions = dict(zip(OUTPUT_COLUMNS, _column_positions(headers)))
+    try:
+        df = pd.read_csv(
+            path,
+            dtype=str,
+            keep_default_na=False,
+            encoding="utf-8",
+            header=None,
+            skiprows=1,
+            index_col=False,
+            usecols=sorted({pos for pos in positions.values() if pos is not None}),
+        )
+    except pd.errors.EmptyDataError:
+        return []
+
+    df = df.fillna("")
+    columns = {
+        name: df[positions[name]].str.strip()
+        for name in ("period", "department", "account")
+    }
+    columns["value"] = (
+        df[positions["value"]].str.translate(_STRIP_COMMAS).astype("float64")
+    )
+    if positions["currency"] is not None:
+        columns["currency"] = df[positions["currency"]].replace("", "USD").str.strip()
+    else:
+        columns["currency"] = pd.Series("USD", index=df.index)
+    if positions["metadata"] is not None:
+        columns["metadata"] = df[positions["metadata"]].str.strip()
+    else:
+        columns["metadata"] = pd.Series("", index=df.index)
+    return list(zip(*(columns[name].tolist() for name in OUTPUT_COLUMNS)))
+
+
+def _column_positions(headers: Sequence[str]) -> Tuple[Optional[int], ...]:
+    """Map :data:`OUTPUT_COLUMNS` to their positions in ``headers``.
+
+    Later duplicates win, matching the dict-based :func:`_normalise_row` path.
+    Missing columns map to ``None``.
+    """
+    index: Mapping[str, int] = {header: idx for idx, header in enumerate(headers) if header}
+    return tuple(index.get(name) for name in OUTPUT_COLUMNS)
+
+
 def read_dataset(path: Path | str) -> List[Tuple[str, str, str, float, str, str]]:
-    """Read a CSV file and return normalised tuples ready for insertion."""
+    """Read a CSV file and return normalised tuples ready for insertion.
+
+    Large files are parsed with vectorised pandas column operations when pandas
+    is installed; otherwise the standard library ``csv`` module is used.
+    """
     path = Path(path)
     if not path.exists():
         raise FileNotFoundError(path)
@@ -43,6 +112,14 @@ def read_dataset(path: Path | str) -> List[Tuple[str, str, str, float, str, str]
     if path.suffix.lower() not in {".csv"}:
         raise ValueError("Only CSV files are supported in the open MVP")
 
+    if path.stat().st_size >= PANDAS_MIN_BYTES:
+        try:
+            import pandas as pd
+        except ImportError:  # pragma: no cover - optional dependency
+            pd = None
+        if pd is not None:
+            return _read_dataset_pandas(pd, path)
+
     with path.open(newline="", encoding="utf-8") as fh:
         reader = csv.DictReader(fh)
         headers = [h.strip().lower() for h in reader.fieldnames or []]
@@ -65,29 +142,12 @@ def load_file(
     *,
     source: str,
     scenario: str,
+    batch_size: int = database.DEFAULT_CHUNK_SIZE,
 ) -> LoadSummary:
     rows = read_dataset(path)
+    prefix = (source, scenario)
     payload: Iterable[tuple[str, str, str, str, str, float, str, str]] = (
-        (
-            source,
-            scenario,
-            period,
-            department,
-            account,
-            value,
-            currency,
-            metadata,
-        )
-        for period, department, account, value, currency, metadata in rows
-    )
-
-    cursor = conn.executemany(
-        """
-        INSERT INTO financial_facts (
-            source, scenario, period, department, account, value, currency, metadata
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """,
-        list(payload),
+        prefix + row for row in rows
     )
-    conn.commit()
-    return LoadSummary(rows_loaded=cursor.rowcount, source=source, scenario=scenario)
+    inserted = database.insert_rows_chunked(conn, payload, chunk_size=batch_size)
+    return LoadSummary(rows_loaded=inserted, source=source, scenario=scenario)
@@ -3,12 +3,12 @@ from __future__ import annotations
 
 import argparse
 import csv
-import json
 import os
+import sys
 from pathlib import Path
 from typing import Iterable, Sequence
 
-from . import ai, database, excel_loader, loader, reporting, scenario
+from . import ai, database, loader, reporting, scenario, serialization
 from .settings import (
     API_BASE_ENV,
     API_KEY_ENV,
@@ -17,9 +17,11 @@ from .settings import (
     DEFAULT_API_BASE,
     DEFAULT_API_MODE,
     DEFAULT_MODEL,
+    ai_defaults,
 )
 
 DEFAULT_DB = Path("financials.db")
+CSV_BUFFER_SIZE = 1 << 20
 
 
 def _ensure_db(db_path: Path) -> None:
@@ -32,20 +34,26 @@ def _open_connection(db_path: Path):
     return database.get_connection(db_path)
 
 
+def _open_csv_output(path: Path | str):
+    # A large buffer turns per-row writes into a handful of write syscalls.
+    return Path(path).open("w", newline="", encoding="utf-8", buffering=CSV_BUFFER_SIZE)
+
+
 def _print_table(headers: Sequence[str], rows: Sequence[Sequence[object]]) -> None:
     if not rows:
         print("(no data)")
         return
-    widths = [len(header) for header in headers]
-    for row in rows:
-        for idx, value in enumerate(row):
-            widths[idx] = max(widths[idx], len(f"{value}"))
-    header_line = " | ".join(header.ljust(widths[idx]) for idx, header in enumerate(headers))
-    separator = "-+-".join("-" * widths[idx] for idx in range(len(headers)))
-    print(header_line)
-    print(separator)
-    for row in rows:
-        print(" | ".join(str(value).ljust(widths[idx]) for idx, value in enumerate(row)))
+    rendered = [tuple(map(str, row)) for row in rows]
+    widths = [
+        max(len(header), *map(len, column))
+        for header, column in zip(headers, zip(*rendered))
+    ]
+    # The padded layout is baked into one template so each row is a single format call.
+    row_format = " | ".join(f"{{{idx}:<{width}}}" for idx, width in enumerate(widths)).format
+    lines = [row_format(*headers), "-+-".join("-" * width for width in widths)]
+    lines.extend(row_format(*row) for row in rendered)
+    # One write for the whole table instead of a print() call per row.
+    sys.stdout.write("\n".join(lines) + "\n")
 
 
 def init_db_command(args: argparse.Namespace) -> None:
@@ -65,6 +73,8 @@ def load_data_command(args: argparse.Namespace) -> None:
                 scenario=args.scenario,
             )
         elif suffix == ".xlsx":
+            from . import excel_loader  # deferred: openpyxl is slow to import
+
             summary = excel_loader.load_workbook_file(
                 conn,
                 args.path,
@@ -81,46 +91,54 @@ def load_data_command(args: argparse.Namespace) -> None:
 
 
 def report_command(args: argparse.Namespace) -> None:
+    headers = ["period", "department", "total"]
     conn = _open_connection(args.db)
     try:
-        rows = reporting.summarise_by_department(conn, scenario=args.scenario)
+        rows = reporting.iter_summarise_by_department(conn, scenario=args.scenario)
+        if args.output:
+            # Rows stream from the cursor into the buffered file unmaterialised.
+            with _open_csv_output(args.output) as fh:
+                writer = csv.writer(fh)
+                writer.writerow(headers)
+                writer.writerows(rows)
+        else:
+            rows = list(rows)
     finally:
         conn.close()
 
     if args.output:
-        with Path(args.output).open("w", newline="", encoding="utf-8") as fh:
-            writer = csv.writer(fh)
-            writer.writerow(["period", "department", "total"])
-            writer.writerows(rows)
         print(f"Report written to {args.output}")
     else:
-        _print_table(["period", "department", "total"], rows)
+        _print_table(headers, rows)
 
 
 def variance_command(args: argparse.Namespace) -> None:
+    headers = ["period", "department", "account", "actual", "budget", "variance"]
     conn = _open_connection(args.db)
     try:
-        rows = reporting.variance_report(
+        rows = reporting.iter_variance_report(
             conn,
             actual_scenario=args.actual,
             budget_scenario=args.budget,
         )
+        if args.output:
+            with _open_csv_output(args.output) as fh:
+                writer = csv.writer(fh)
+                writer.writerow(headers)
+                writer.writerows(rows)
+        else:
+            rows = list(rows)
     finally:
         conn.close()
 
     if args.output:
-        with Path(args.output).open("w", newline="", encoding="utf-8") as fh:
-            writer = csv.writer(fh)
-            writer.writerow(["period", "department", "account", "actual", "budget", "variance"])
-            writer.writerows(rows)
         print(f"Variance report written to {args.output}")
     else:
-        _print_table(["period", "department", "account", "actual", "budget", "variance"], rows)
+        _print_table(headers, rows)
 
 
 def build_scenario_command(args: argparse.Namespace) -> None:
     conn = _open_connection(args.db)
-    records: list[tuple[str, str, str, str, str, float, str, str]] = []
     try:
         adjustments = [
             scenario.ScenarioAdjustment(
@@ -138,40 +156,26 @@ def build_scenario_command(args: argparse.Namespace) -> None:
             print("Source scenario has no data")
             return
 
-        records = [
-            (
-                f"scenario:{args.source}",
-                args.target,
-                period,
-                department,
-                account,
-                value,
-                currency,
-                metadata,
-            )
-            for period, department, account, value, currency, metadata in rows
-        ]
-
         if args.persist:
-            inserted = database.insert_rows(conn, records)
+            records = scenario.scenario_records(
+                rows, source_scenario=args.source, target_scenario=args.target
+            )
+            inserted = database.bulk_insert_rows(conn, records)
             print(f"Scenario '{args.target}' stored in the database ({inserted} rows)")
     finally:
         conn.close()
 
-    display_rows = [
-        (period, department, account, round(value, 2), currency)
-        for (_, _, period, department, account, value, currency, _) in records
-    ]
     if args.output:
-        with Path(args.output).open("w", newline="", encoding="utf-8") as fh:
+        with _open_csv_output(args.output) as fh:
             writer = csv.writer(fh)
             writer.writerow(["period", "department", "account", "value", "currency", "metadata"])
-            writer.writerows(
-                (period, department, account, value, currency, metadata)
-                for (_, _, period, department, account, value, currency, metadata) in records
-            )
+            writer.writerows(rows)
         print(f"Scenario exported to {args.output}")
     else:
+        display_rows = [
+            (period, department, account, round(value, 2), currency)
+            for period, department, account, value, currency, _ in rows
+        ]
         _print_table(["period", "department", "account", "value", "currency"], display_rows)
 
 
@@ -183,9 +187,10 @@ def insights_command(args: argparse.Namespace) -> None:
             f"{API_KEY_ENV} environment variable."
         )
 
-    api_base = args.api_base or os.environ.get(API_BASE_ENV) or DEFAULT_API_BASE
-    model = args.model or os.environ.get(MODEL_ENV) or DEFAULT_MODEL
-    mode_value = args.api_mode or os.environ.get(API_MODE_ENV) or DEFAULT_API_MODE
+    defaults = ai_defaults()
+    api_base = args.api_base or defaults.api_base
+    model = args.model or defaults.model
+    mode_value = args.api_mode or defaults.mode
     if mode_value not in {"chat-completions", "responses"}:
         raise SystemExit(
             "API mode must be either 'chat-completions' or 'responses' (received "
@@ -195,16 +200,16 @@ def insights_command(args: argparse.Namespace) -> None:
 
     conn = _open_connection(args.db)
     try:
-        rows = reporting.variance_report(
-            conn,
-            actual_scenario=args.actual,
-            budget_scenario=args.budget,
+        structured_rows = reporting.serialise_variance_rows(
+            reporting.iter_variance_report(
+                conn,
+                actual_scenario=args.actual,
+                budget_scenario=args.budget,
+            )
         )
     finally:
         conn.close()
 
-    structured_rows = reporting.serialise_variance_rows(rows)
-
     config = ai.AIConfig(api_key=api_key, api_base=api_base, model=model, mode=mode)
     insights = ai.generate_insights(structured_rows, config)
 
@@ -212,7 +217,7 @@ def insights_command(args: argparse.Namespace) -> None:
         output_path = Path(args.output)
         if args.format == "json":
             payload = {"insights": insights, "rows": structured_rows}
-            output_path.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+            output_path.write_bytes(serialization.dumps(payload, indent=True))
         else:
             output_path.write_text(insights, encoding="utf-8")
         print(f"Insights written to {output_path}")
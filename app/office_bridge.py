@@ -1,34 +1,58 @@
 """HTTP bridge exposing key datarails-open operations for the Excel add-in."""
 from __future__ import annotations
 
+import asyncio
+import hmac
 import os
-from contextlib import closing
+import queue
+import sqlite3
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+from functools import lru_cache
 from pathlib import Path
-from typing import Iterable, List, Optional
+from typing import Iterator, List, Optional
 
 from cryptography.fernet import Fernet, InvalidToken
 from fastapi import FastAPI, HTTPException, Query, Security
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from pydantic import BaseModel, ConfigDict, Field
 
-from . import ai, database, excel_loader, loader, reporting, scenario
+from . import ai, database, loader, reporting, scenario, serialization
 from . import insights_repository
-from .settings import (
-    API_BASE_ENV,
-    API_KEY_ENV,
-    API_MODE_ENV,
-    MODEL_ENV,
-    DEFAULT_API_BASE,
-    DEFAULT_API_MODE,
-    DEFAULT_MODEL,
-)
+from .settings import API_KEY_ENV, ai_defaults
 
 DEFAULT_DB_PATH = Path(os.environ.get("DATARAILS_DB", "financials.db"))
 BRIDGE_TOKEN_ENV = "DATARAILS_OPEN_BRIDGE_TOKEN"
 SECRET_STORAGE_DIR = Path(__file__).resolve().parent
 SECRET_KEY_PATH = SECRET_STORAGE_DIR / ".bridge_api_secret"
 ENCRYPTED_API_KEY_PATH = SECRET_STORAGE_DIR / ".bridge_api_key"
+LOAD_DATA_WORKERS = min(os.cpu_count() or 1, 4)
+LOAD_CACHE_SIZE = 64
+# Idle connections kept warm between requests. Each one carries its own page
+# cache (see database.CONNECTION_PRAGMAS), so the pool stays small; bursts
+# beyond it open short-lived connections that are closed when returned.
+CONNECTION_POOL_SIZE = 8
+# Passing this as the database path backs the bridge with a throwaway
+# in-memory database, e.g. for tests.
+MEMORY_DATABASE = ":memory:"
+
+
+# Walks idx_financial_facts_reporting one distinct scenario at a time, so the
+# cost grows with the number of scenarios rather than the number of facts.
+LIST_SCENARIOS_SQL = """
+WITH RECURSIVE scenarios(name) AS (
+    SELECT MIN(scenario) FROM financial_facts
+    UNION ALL
+    SELECT (SELECT MIN(scenario) FROM financial_facts WHERE scenario > name)
+    FROM scenarios
+    WHERE name IS NOT NULL
+)
+SELECT name FROM scenarios WHERE name IS NOT NULL ORDER BY name
+"""
 
 
 class LoadDataRequest(BaseModel):
@@ -43,6 +67,14 @@ class LoadDataRequest(BaseModel):
         default=None,
         description="List of table names to import when loading from Excel",
     )
+    batch_size: int = Field(
+        database.DEFAULT_CHUNK_SIZE,
+        alias="batchSize",
+        ge=1,
+        description="Number of rows inserted per executemany batch",
+    )
+
+    model_config = ConfigDict(populate_by_name=True)
 
 
 class ScenarioExportRequest(BaseModel):
@@ -81,12 +113,22 @@ class InsightsRequest(BaseModel):
     model_config = ConfigDict(populate_by_name=True)
 
 
+class BridgeJSONResponse(JSONResponse):
+    """JSON response rendered with :func:`serialization.dumps` (orjson when installed)."""
+
+    def render(self, content: object) -> bytes:
+        return serialization.dumps(content)
+
+
 def _normalise_path(path_str: str) -> Path:
-    path = Path(path_str).expanduser()
-    if not path.is_absolute():
-        # Allow paths relative to the repository root for convenience.
-        path = Path.cwd() / path
-    return path
+    if os.path.isabs(path_str):
+        return Path(path_str)
+    if path_str.startswith("~"):
+        path_str = os.path.expanduser(path_str)
+        if os.path.isabs(path_str):
+            return Path(path_str)
+    # Allow paths relative to the repository root for convenience.
+    return Path(os.getcwd(), path_str)
 
 
 def _ensure_database(db_path: Path) -> None:
@@ -105,52 +147,140 @@ def _write_secure_file(path: Path, data: bytes) -> None:
     os.chmod(path, 0o600)
 
 
-def _load_or_create_secret_key() -> bytes:
-    if SECRET_KEY_PATH.exists():
-        return SECRET_KEY_PATH.read_bytes()
+def _load_or_create_secret_key(key_path: Path = SECRET_KEY_PATH) -> bytes:
+    if key_path.exists():
+        return key_path.read_bytes()
     key = Fernet.generate_key()
-    _write_secure_file(SECRET_KEY_PATH, key)
+    _write_secure_file(key_path, key)
     return key
 
 
+@lru_cache(maxsize=1)
+def _cipher_for(key_path: Path, mtime_ns: int) -> Fernet:
+    return Fernet(key_path.read_bytes())
+
+
+def _get_cipher(key_path: Path = SECRET_KEY_PATH) -> Fernet:
+    """Return the process-wide cipher, rebuilt only when the key file changes."""
+    if not key_path.exists():
+        _load_or_create_secret_key(key_path)
+    return _cipher_for(key_path, key_path.stat().st_mtime_ns)
+
+
 class BridgeService:
     """Wrapper around the core modules that enforces consistent database usage."""
 
-    def __init__(self, database_path: Path | str | None = None) -> None:
+    def __init__(
+        self,
+        database_path: Path | str | None = None,
+        *,
+        pool_size: int = CONNECTION_POOL_SIZE,
+        secret_dir: Path | str | None = None,
+    ) -> None:
         self.database_path = Path(database_path or DEFAULT_DB_PATH)
-        self._cipher: Fernet | None = None
-
-    def _connection(self):
-        _ensure_database(self.database_path)
-        conn = database.get_connection(self.database_path)
-        database.run_migrations(conn)
+        storage_dir = Path(secret_dir) if secret_dir is not None else SECRET_STORAGE_DIR
+        self.secret_key_path = storage_dir / SECRET_KEY_PATH.name
+        self.encrypted_api_key_path = storage_dir / ENCRYPTED_API_KEY_PATH.name
+        self._migrated = False
+        self._migration_lock = threading.Lock()
+        self._pool: queue.LifoQueue[sqlite3.Connection] = queue.LifoQueue(maxsize=pool_size)
+        self._load_cache: dict[tuple[object, ...], dict] = {}
+        self._load_cache_lock = threading.Lock()
+        self._memory_uri: Optional[str] = None
+        self._memory_anchor: Optional[sqlite3.Connection] = None
+        if str(database_path) == MEMORY_DATABASE:
+            # Every ":memory:" connection would get its own empty database, so
+            # pooled connections share one named in-memory database instead.
+            # The anchor connection keeps it alive for the service's lifetime.
+            self._memory_uri = f"file:bridge-{uuid.uuid4().hex}?mode=memory&cache=shared"
+            self._memory_anchor = database.get_connection(
+                self._memory_uri, check_same_thread=False, uri=True
+            )
+            self._memory_anchor.executescript(database.SCHEMA)
+
+    def _open_connection(self) -> sqlite3.Connection:
+        if self._memory_uri is not None:
+            conn = database.get_connection(self._memory_uri, check_same_thread=False, uri=True)
+        else:
+            _ensure_database(self.database_path)
+            conn = database.get_connection(self.database_path, check_same_thread=False)
+        if not self._migrated:
+            # Migrations only need to run once per service, not per request.
+            with self._migration_lock:
+                if not self._migrated:
+                    database.run_migrations(conn)
+                    self._migrated = True
         return conn
 
-    def _get_cipher(self) -> Fernet:
-        if self._cipher is None:
-            key_bytes = _load_or_create_secret_key()
-            self._cipher = Fernet(key_bytes)
-        return self._cipher
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        """Lend a pooled connection to one request at a time.
+
+        Idle connections are kept in a LIFO queue so the most recently used,
+        cache-warm connection is handed out first; connections beyond the
+        pool size are closed when returned.
+        """
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = self._open_connection()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            try:
+                self._pool.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Lend a pooled connection whose block commits on success.
+
+        The connection's own context manager issues ``COMMIT`` when the block
+        exits cleanly and ``ROLLBACK`` when it raises, so write paths end in
+        one well-defined transaction boundary.
+        """
+        with self._connection() as conn:
+            with conn:
+                yield conn
+
+    def close(self) -> None:
+        """Close every idle pooled connection."""
+        while True:
+            try:
+                conn = self._pool.get_nowait()
+            except queue.Empty:
+                return
+            conn.close()
+
+    def dispose(self) -> None:
+        """Close the pool and release the shared in-memory database, if any."""
+        self.close()
+        if self._memory_anchor is not None:
+            self._memory_anchor.close()
+            self._memory_anchor = None
 
     def store_api_key(self, api_key: Optional[str]) -> None:
         if not api_key:
-            ENCRYPTED_API_KEY_PATH.unlink(missing_ok=True)
+            self.encrypted_api_key_path.unlink(missing_ok=True)
             return
 
-        cipher = self._get_cipher()
+        cipher = _get_cipher(self.secret_key_path)
         encrypted = cipher.encrypt(api_key.encode("utf-8"))
-        _write_secure_file(ENCRYPTED_API_KEY_PATH, encrypted)
+        _write_secure_file(self.encrypted_api_key_path, encrypted)
 
     def get_api_key(self) -> Optional[str]:
         env_key = os.environ.get(API_KEY_ENV)
         if env_key:
             return env_key
-        if not ENCRYPTED_API_KEY_PATH.exists():
+        if not self.encrypted_api_key_path.exists():
             return None
 
-        cipher = self._get_cipher()
+        cipher = _get_cipher(self.secret_key_path)
         try:
-            encrypted = ENCRYPTED_API_KEY_PATH.read_bytes()
+            encrypted = self.encrypted_api_key_path.read_bytes()
             decrypted = cipher.decrypt(encrypted)
         except InvalidToken as exc:  # pragma: no cover - unexpected corruption
             raise HTTPException(
@@ -160,12 +290,36 @@ class BridgeService:
         return decrypted.decode("utf-8")
 
     def load_data(self, request: LoadDataRequest) -> dict:
+        """Import a CSV or XLSX file into the warehouse.
+
+        Loads are assumed to be idempotent: repeating a request for a file whose
+        modification time and size are unchanged returns the earlier summary
+        without inserting the rows again. Touch the file to force a reload.
+        """
         source_path = _normalise_path(request.path)
-        if not source_path.exists():
-            raise HTTPException(status_code=404, detail=f"File not found: {source_path}")
+        try:
+            stat = source_path.stat()
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail=f"File not found: {source_path}") from None
+
+        cache_key = (
+            str(source_path),
+            stat.st_mtime_ns,
+            stat.st_size,
+            request.source,
+            request.scenario,
+            tuple(request.sheets or ()),
+            tuple(request.tables or ()),
+        )
+        with self._load_cache_lock:
+            cached = self._load_cache.pop(cache_key, None)
+            if cached is not None:
+                # Re-inserting keeps the dict ordered from least to most recent.
+                self._load_cache[cache_key] = cached
+                return dict(cached)
 
         suffix = source_path.suffix.lower()
-        with closing(self._connection()) as conn:
+        with self._transaction() as conn:
             try:
                 if suffix == ".csv":
                     summary = loader.load_file(
@@ -173,8 +327,13 @@ class BridgeService:
                         source_path,
                         source=request.source,
                         scenario=request.scenario,
+                        batch_size=request.batch_size,
                     )
                 elif suffix == ".xlsx":
+                    # openpyxl is only imported once a workbook is loaded, so
+                    # CSV-only workers never pay for it.
+                    from . import excel_loader
+
                     summary = excel_loader.load_workbook_file(
                         conn,
                         source_path,
@@ -182,6 +341,7 @@ class BridgeService:
                         scenario=request.scenario,
                         sheets=request.sheets,
                         tables=request.tables,
+                        batch_size=request.batch_size,
                     )
                 else:
                     raise HTTPException(
@@ -190,29 +350,32 @@ class BridgeService:
                     )
             except ValueError as exc:
                 raise HTTPException(status_code=400, detail=str(exc)) from exc
-        return {
+        result = {
             "rowsLoaded": summary.rows_loaded,
             "source": summary.source,
             "scenario": summary.scenario,
             "message": str(summary),
         }
+        with self._load_cache_lock:
+            if cache_key not in self._load_cache and len(self._load_cache) >= LOAD_CACHE_SIZE:
+                del self._load_cache[next(iter(self._load_cache))]
+            self._load_cache[cache_key] = result
+        return dict(result)
 
     def refresh_report(self, scenario_name: Optional[str]) -> dict:
-        with closing(self._connection()) as conn:
-            rows = reporting.summarise_by_department(conn, scenario=scenario_name)
-        serialised = [
-            {"period": period, "department": department, "total": total}
-            for period, department, total in rows
-        ]
+        with self._connection() as conn:
+            serialised = [
+                {"period": period, "department": department, "total": total}
+                for period, department, total in reporting.iter_summarise_by_department(
+                    conn, scenario=scenario_name
+                )
+            ]
         return {"scenario": scenario_name, "rows": serialised}
 
     def list_scenarios(self) -> list[str]:
-        with closing(self._connection()) as conn:
-            cursor = conn.execute(
-                "SELECT DISTINCT scenario FROM financial_facts "
-                "WHERE scenario IS NOT NULL ORDER BY scenario"
-            )
-            return [value for (value,) in cursor.fetchall()]
+        with self._connection() as conn:
+            cursor = conn.execute(LIST_SCENARIOS_SQL)
+            return [value for (value,) in cursor]
 
     def export_scenario(self, request: ScenarioExportRequest) -> dict:
         adjustment = scenario.ScenarioAdjustment(
@@ -220,7 +383,7 @@ class BridgeService:
             account=request.account,
             percentage_change=request.percentage_change,
         )
-        with closing(self._connection()) as conn:
+        with self._transaction() as conn:
             rows = scenario.build_scenario(
                 conn,
                 source_scenario=request.source_scenario,
@@ -234,22 +397,14 @@ class BridgeService:
                         "Ensure it has been loaded before exporting."
                     ),
                 )
-            payload: Iterable[tuple[str, str, str, str, str, float, str, str]] = (
-                (
-                    f"scenario:{request.source_scenario}",
-                    request.target_scenario,
-                    period,
-                    department,
-                    account,
-                    value,
-                    currency,
-                    metadata,
-                )
-                for period, department, account, value, currency, metadata in rows
-            )
             inserted = 0
             if request.persist:
-                inserted = database.insert_rows(conn, payload)
+                payload = scenario.scenario_records(
+                    rows,
+                    source_scenario=request.source_scenario,
+                    target_scenario=request.target_scenario,
+                )
+                inserted = database.bulk_insert_rows(conn, payload)
         serialised = [
             {
                 "period": period,
@@ -285,9 +440,10 @@ class BridgeService:
                 ),
             )
 
-        api_base = (api_settings.api_base if api_settings else None) or os.environ.get(API_BASE_ENV) or DEFAULT_API_BASE
-        model = (api_settings.model if api_settings else None) or os.environ.get(MODEL_ENV) or DEFAULT_MODEL
-        mode_value = (api_settings.mode if api_settings else None) or os.environ.get(API_MODE_ENV) or DEFAULT_API_MODE
+        defaults = ai_defaults()
+        api_base = (api_settings.api_base if api_settings else None) or defaults.api_base
+        model = (api_settings.model if api_settings else None) or defaults.model
+        mode_value = (api_settings.mode if api_settings else None) or defaults.mode
         if mode_value not in {"chat-completions", "responses"}:
             raise HTTPException(
                 status_code=400,
@@ -295,38 +451,54 @@ class BridgeService:
             )
         mode = "responses" if mode_value == "responses" else "chat_completions"
 
-        with closing(self._connection()) as conn:
-            rows = reporting.variance_report(
-                conn,
-                actual_scenario=request.actual_scenario,
-                budget_scenario=request.budget_scenario,
-            )
-        structured_rows = reporting.serialise_variance_rows(rows)
-
         config = ai.AIConfig(api_key=api_key, api_base=api_base, model=model, mode=mode)
-        try:
-            insights_text = ai.generate_insights(
-                structured_rows,
-                config,
-                prompt=request.prompt,
+        with self._connection() as conn:
+            if not any(
+                reporting.scenarios_present(
+                    conn, request.actual_scenario, request.budget_scenario
+                )
+            ):
+                raise HTTPException(
+                    status_code=400,
+                    detail=(
+                        f"Neither scenario '{request.actual_scenario}' nor "
+                        f"'{request.budget_scenario}' has any data to analyse."
+                    ),
+                )
+            structured_rows = reporting.serialise_variance_rows(
+                reporting.iter_variance_report(
+                    conn,
+                    actual_scenario=request.actual_scenario,
+                    budget_scenario=request.budget_scenario,
+                )
             )
-        except ValueError as exc:
-            raise HTTPException(status_code=400, detail=str(exc)) from exc
-        except RuntimeError as exc:
-            raise HTTPException(status_code=502, detail=str(exc)) from exc
-        except Exception as exc:  # pragma: no cover - safeguard against unexpected errors
-            raise HTTPException(status_code=502, detail=f"AI request failed: {exc}") from exc
-
-        row_count = len(structured_rows)
-
-        with closing(self._connection()) as conn:
+            prepared = ai.prepare_insights(structured_rows, config, prompt=request.prompt)
             repository = insights_repository.InsightsRepository(conn)
+            insights_text = repository.find_by_prompt_hash(prepared.cache_key)
+
+            if insights_text is None:
+                try:
+                    insights_text = ai.generate_insights(
+                        structured_rows,
+                        config,
+                        prompt=request.prompt,
+                        prepared=prepared,
+                    )
+                except ValueError as exc:
+                    raise HTTPException(status_code=400, detail=str(exc)) from exc
+                except RuntimeError as exc:
+                    raise HTTPException(status_code=502, detail=str(exc)) from exc
+                except Exception as exc:  # pragma: no cover - safeguard against unexpected errors
+                    raise HTTPException(status_code=502, detail=f"AI request failed: {exc}") from exc
+
+            row_count = len(structured_rows)
             repository.create(
                 actual=request.actual_scenario,
                 budget=request.budget_scenario,
                 prompt=request.prompt,
                 insights=insights_text,
                 row_count=row_count,
+                prompt_hash=prepared.cache_key,
             )
 
         payload: dict[str, object] = {
@@ -352,7 +524,7 @@ class BridgeService:
         page_size = max(1, min(page_size, 100))
         offset = (page - 1) * page_size
 
-        with closing(self._connection()) as conn:
+        with self._connection() as conn:
             repository = insights_repository.InsightsRepository(conn)
             records, total = repository.list(
                 actual=actual,
@@ -382,11 +554,41 @@ class BridgeService:
         }
 
 
-def create_app(database_path: Path | str | None = None) -> FastAPI:
-    """Create and configure the FastAPI application."""
+def create_app(
+    database_path: Path | str | None = None,
+    *,
+    secret_dir: Path | str | None = None,
+) -> FastAPI:
+    """Create and configure the FastAPI application.
+
+    ``secret_dir`` overrides where the encrypted API key and its secret are
+    stored; by default they live next to this module.
+    """
+
+    service = BridgeService(database_path=database_path, secret_dir=secret_dir)
+    # Imports get their own bounded pool so large workbooks cannot exhaust the
+    # threads FastAPI uses for every other synchronous endpoint.
+    load_executor = ThreadPoolExecutor(
+        max_workers=LOAD_DATA_WORKERS,
+        thread_name_prefix="bridge-load",
+    )
 
-    service = BridgeService(database_path=database_path)
-    app = FastAPI(title="datarails-open office bridge", version="1.0.0")
+    @asynccontextmanager
+    async def lifespan(_: FastAPI):
+        try:
+            yield
+        finally:
+            load_executor.shutdown(wait=False)
+            service.dispose()
+            ai.close_clients()
+
+    app = FastAPI(
+        title="datarails-open office bridge",
+        version="1.0.0",
+        default_response_class=BridgeJSONResponse,
+        lifespan=lifespan,
+    )
+    app.state.bridge_service = service
 
     allowed_origins = {
         "https://localhost:3000",
@@ -413,10 +615,10 @@ def create_app(database_path: Path | str | None = None) -> FastAPI:
                     f"{BRIDGE_TOKEN_ENV} to enable secure credential storage."
                 ),
             )
-        if (
-            credentials is None
-            or credentials.scheme.lower() != "bearer"
-            or credentials.credentials != expected
+        # HTTPBearer only yields credentials for the Bearer scheme; compare
+        # tokens in constant time so timing cannot reveal a matching prefix.
+        if credentials is None or not hmac.compare_digest(
+            credentials.credentials.encode("utf-8"), expected.encode("utf-8")
         ):
             raise HTTPException(
                 status_code=401,
@@ -424,9 +626,13 @@ def create_app(database_path: Path | str | None = None) -> FastAPI:
             )
         return True
 
+    # Handlers that touch SQLite stay plain ``def`` so FastAPI runs them on the
+    # worker threads; blocking calls inside ``async def`` would stall the loop.
+    # /load-data is the exception because it awaits its own executor.
     @app.post("/load-data")
-    def load_data(request: LoadDataRequest):
-        return service.load_data(request)
+    async def load_data(request: LoadDataRequest):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(load_executor, service.load_data, request)
 
     @app.get("/reports/summary")
     def reports_summary(scenario: Optional[str] = Query(default=None)):
@@ -2,7 +2,75 @@
 from __future__ import annotations
 
 from sqlite3 import Connection
-from typing import List, Sequence, Tuple
+from typing import Iterable, Iterator, List, Tuple
+
+# Statements are module constants so every call passes the identical string and
+# hits the sqlite3 module's per-connection prepared-statement cache.
+SUMMARY_SQL = """
+SELECT period, department, TOTAL(value) AS total
+FROM financial_facts
+GROUP BY period, department
+ORDER BY period, department
+"""
+
+SUMMARY_BY_SCENARIO_SQL = """
+SELECT period, department, TOTAL(value) AS total
+FROM financial_facts
+WHERE scenario = ?
+GROUP BY period, department
+ORDER BY period, department
+"""
+
+# Each scenario's total is aggregated once per group; variance is derived from
+# the two totals instead of re-aggregating both CASE expressions.
+VARIANCE_SQL = """
+SELECT period, department, account, actual, budget, actual - budget AS variance
+FROM (
+    SELECT
+        period,
+        department,
+        account,
+        TOTAL(CASE WHEN scenario = ? THEN value END) AS actual,
+        TOTAL(CASE WHEN scenario = ? THEN value END) AS budget
+    FROM financial_facts
+    WHERE scenario IN (?, ?)
+    GROUP BY period, department, account
+)
+ORDER BY period, department, account
+"""
+
+# Each EXISTS is a single probe of idx_financial_facts_reporting.
+SCENARIO_PRESENCE_SQL = """
+SELECT
+    EXISTS(SELECT 1 FROM financial_facts WHERE scenario = ?),
+    EXISTS(SELECT 1 FROM financial_facts WHERE scenario = ?)
+"""
+
+
+def scenarios_present(
+    conn: Connection,
+    actual_scenario: str,
+    budget_scenario: str,
+) -> Tuple[bool, bool]:
+    """Return whether each scenario has at least one fact."""
+    actual, budget = conn.execute(
+        SCENARIO_PRESENCE_SQL, (actual_scenario, budget_scenario)
+    ).fetchone()
+    return bool(actual), bool(budget)
+
+
+def iter_summarise_by_department(
+    conn: Connection,
+    *,
+    scenario: str | None = None,
+) -> Iterator[Tuple[str, str, float]]:
+    """Yield totals per department and period straight from the cursor."""
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    if scenario:
+        yield from cursor.execute(SUMMARY_BY_SCENARIO_SQL, (scenario,))
+    else:
+        yield from cursor.execute(SUMMARY_SQL)
 
 
 def summarise_by_department(
@@ -11,19 +79,32 @@ def summarise_by_department(
     scenario: str | None = None,
 ) -> List[Tuple[str, str, float]]:
     """Return aggregated totals per department and period."""
-    if scenario:
-        query = (
-            "SELECT period, department, SUM(value) as total "
-            "FROM financial_facts WHERE scenario = ? GROUP BY period, department ORDER BY period, department"
-        )
-        rows = conn.execute(query, (scenario,)).fetchall()
-    else:
-        query = (
-            "SELECT period, department, SUM(value) as total "
-            "FROM financial_facts GROUP BY period, department ORDER BY period, department"
-        )
-        rows = conn.execute(query).fetchall()
-    return [(row["period"], row["department"], float(row["total"])) for row in rows]
+    return list(iter_summarise_by_department(conn, scenario=scenario))
+
+
+def iter_variance_report(
+    conn: Connection,
+    *,
+    actual_scenario: str,
+    budget_scenario: str,
+    check_presence: bool = False,
+) -> Iterator[Tuple[str, str, str, float, float, float]]:
+    """Yield variance rows between two scenarios straight from the cursor.
+
+    ``TOTAL()`` always returns a float (``0.0`` for a scenario with no facts in
+    a group), so rows are yielded as SQLite produces them with no coercion.
+    With ``check_presence=True`` the aggregation is skipped entirely when
+    neither scenario has facts, at the cost of one :func:`scenarios_present`
+    probe on every call.
+    """
+    if check_presence and not any(scenarios_present(conn, actual_scenario, budget_scenario)):
+        return
+    cursor = conn.cursor()
+    cursor.row_factory = None  # plain tuples rather than sqlite3.Row objects
+    yield from cursor.execute(
+        VARIANCE_SQL,
+        (actual_scenario, budget_scenario, actual_scenario, budget_scenario),
+    )
 
 
 def variance_report(
@@ -31,41 +112,21 @@ def variance_report(
     *,
     actual_scenario: str,
     budget_scenario: str,
+    check_presence: bool = False,
 ) -> List[Tuple[str, str, str, float, float, float]]:
     """Produce a variance report between two scenarios."""
-    query = """
-    SELECT
-        period,
-        department,
-        account,
-        SUM(CASE WHEN scenario = ? THEN value ELSE 0 END) AS actual,
-        SUM(CASE WHEN scenario = ? THEN value ELSE 0 END) AS budget,
-        SUM(CASE WHEN scenario = ? THEN value ELSE 0 END) -
-        SUM(CASE WHEN scenario = ? THEN value ELSE 0 END) AS variance
-    FROM financial_facts
-    WHERE scenario IN (?, ?)
-    GROUP BY period, department, account
-    ORDER BY period, department, account
-    """
-    rows = conn.execute(
-        query,
-        (
-            actual_scenario,
-            budget_scenario,
-            actual_scenario,
-            budget_scenario,
-            actual_scenario,
-            budget_scenario,
-        ),
-    ).fetchall()
-    return [
-        (row["period"], row["department"], row["account"], float(row["actual"]), float(row["budget"]), float(row["variance"]))
-        for row in rows
-    ]
+    return list(
+        iter_variance_report(
+            conn,
+            actual_scenario=actual_scenario,
+            budget_scenario=budget_scenario,
+            check_presence=check_presence,
+        )
+    )
 
 
 def serialise_variance_rows(
-    rows: Sequence[Tuple[str, str, str, float, float, float]]
+    rows: Iterable[Tuple[str, str, str, float, float, float]]
 ) -> List[dict[str, object]]:
     """Convert tuples from :func:`variance_report` into dictionaries."""
 
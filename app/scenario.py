@@ -1,43 +1,60 @@
 """Scenario modelling utilities built on top of SQLite."""
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from sqlite3 import Connection
-from typing import Iterable, List, Tuple
+from typing import Dict, Iterable, Iterator, List, Tuple
 
 Row = Tuple[str, str, str, float, str, str]
 
 
-def fetch_dataset(conn: Connection, scenario: str) -> List[Row]:
-    rows = conn.execute(
-        "SELECT period, department, account, value, currency, IFNULL(metadata, '') as metadata "
+def _iter_rows(
+    conn: Connection,
+    scenario: str,
+    value_sql: str = "value",
+    params: Tuple[object, ...] = (),
+) -> Iterator[Row]:
+    # ``value`` is a REAL column, so it and any arithmetic on it come back as
+    # floats; plain tuples are yielded straight from the cursor.
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    yield from cursor.execute(
+        f"SELECT period, department, account, {value_sql} AS value, currency, "
+        "IFNULL(metadata, '') as metadata "
         "FROM financial_facts WHERE scenario = ?",
-        (scenario,),
-    ).fetchall()
-    return [
-        (
-            row["period"],
-            row["department"],
-            row["account"],
-            float(row["value"]),
-            row["currency"],
-            row["metadata"],
-        )
-        for row in rows
-    ]
-
-
-@dataclass
+        (*params, scenario),
+    )
+
+
+def iter_dataset(conn: Connection, scenario: str) -> Iterator[Row]:
+    """Yield a scenario's rows straight from the cursor."""
+    return _iter_rows(conn, scenario)
+
+
+def fetch_dataset(conn: Connection, scenario: str) -> List[Row]:
+    return list(iter_dataset(conn, scenario))
+
+
+@dataclass(frozen=True)
 class ScenarioAdjustment:
     department: str | None = None
     account: str | None = None
     percentage_change: float = 0.0
+    _department_key: str | None = field(init=False, repr=False, compare=False)
+    _account_key: str | None = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        # Lower-case the filters once so matching only lower-cases the row side.
+        department_key = self.department.lower() if self.department else None
+        account_key = self.account.lower() if self.account else None
+        object.__setattr__(self, "_department_key", department_key)
+        object.__setattr__(self, "_account_key", account_key)
 
     def matches(self, row: Row) -> bool:
         _, department, account, _, _, _ = row
-        if self.department and department.lower() != self.department.lower():
+        if self._department_key and department.lower() != self._department_key:
             return False
-        if self.account and account.lower() != self.account.lower():
+        if self._account_key and account.lower() != self._account_key:
             return False
         return True
 
@@ -46,25 +63,86 @@ def apply_adjustments(
     rows: Iterable[Row],
     adjustments: Iterable[ScenarioAdjustment],
 ) -> List[Row]:
-    adjusted: List[Row] = []
+    """Apply every matching adjustment to each row's value.
+
+    Matching depends only on a row's department and account, so the
+    multipliers are resolved once per distinct pair rather than per row.
+    """
     adjustments = list(adjustments)
+    multipliers: Dict[Tuple[str, str], Tuple[float, ...]] = {}
+    adjusted: List[Row] = []
+    append = adjusted.append
     for row in rows:
+        key = (row[1], row[2])
+        factors = multipliers.get(key)
+        if factors is None:
+            factors = tuple(
+                1 + adj.percentage_change for adj in adjustments if adj.matches(row)
+            )
+            multipliers[key] = factors
+        if not factors:
+            # Rows no adjustment touches are passed through without a copy.
+            append(row)
+            continue
         period, department, account, value, currency, metadata = row
-        adjusted_value = value
-        for adj in adjustments:
-            if adj.matches(row):
-                adjusted_value = adjusted_value * (1 + adj.percentage_change)
-        adjusted.append((period, department, account, adjusted_value, currency, metadata))
+        for factor in factors:
+            value = value * factor
+        append((period, department, account, value, currency, metadata))
     return adjusted
 
 
+def _adjusted_value_sql(
+    adjustments: List[ScenarioAdjustment],
+) -> Tuple[str, Tuple[object, ...]] | None:
+    """Express the adjustments as a SQL product over ``value``.
+
+    Each adjustment contributes one ``CASE`` factor, multiplied left to right
+    in list order just like :func:`apply_adjustments`. SQLite's ``lower()`` only
+    folds ASCII, so ``None`` is returned for non-ASCII filters and the caller
+    falls back to matching in Python.
+    """
+    factors: List[str] = []
+    params: List[object] = []
+    for adj in adjustments:
+        conditions: List[str] = []
+        for column, key in (("department", adj._department_key), ("account", adj._account_key)):
+            if not key:
+                continue
+            if not key.isascii():
+                return None
+            conditions.append(f"lower({column}) = ?")
+            params.append(key)
+        if conditions:
+            factors.append(f"(CASE WHEN {' AND '.join(conditions)} THEN ? ELSE 1.0 END)")
+        else:
+            factors.append("?")
+        params.append(1 + adj.percentage_change)
+    return " * ".join(["value", *factors]), tuple(params)
+
+
 def build_scenario(
     conn: Connection,
     *,
     source_scenario: str,
     adjustments: Iterable[ScenarioAdjustment],
 ) -> List[Row]:
-    base_rows = fetch_dataset(conn, source_scenario)
-    if not base_rows:
-        return []
-    return apply_adjustments(base_rows, adjustments)
+    adjustments = list(adjustments)
+    value_sql = _adjusted_value_sql(adjustments)
+    if value_sql is None:
+        # Adjusting straight off the cursor keeps a single list of rows in memory.
+        return apply_adjustments(iter_dataset(conn, source_scenario), adjustments)
+    expression, params = value_sql
+    return list(_iter_rows(conn, source_scenario, expression, params))
+
+
+def scenario_records(
+    rows: Iterable[Row],
+    *,
+    source_scenario: str,
+    target_scenario: str,
+) -> Iterator[Tuple[str, str, str, str, str, float, str, str]]:
+    """Prefix scenario rows with their provenance, ready for insertion."""
+    prefix = (f"scenario:{source_scenario}", target_scenario)
+    # A bare generator expression beats map(prefix.__add__, ...) and a
+    # generator function here: each row costs one tuple concatenation.
+    return (prefix + row for row in rows)
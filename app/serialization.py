@@ -0,0 +1,26 @@
+"""JSON encoding helpers that use orjson when it is installed."""
+from __future__ import annotations
+
+import json
+
+try:  # pragma: no cover - optional dependency
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+
+def dumps(obj: object, *, indent: bool = False) -> bytes:
+    """Serialise ``obj`` to UTF-8 encoded JSON.
+
+    Output is compact unless ``indent`` is set, which uses two-space indentation
+    for files meant to be read by people. Without orjson, non-finite floats
+    raise ``ValueError`` (orjson writes them as ``null``).
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2) if indent else orjson.dumps(obj)
+    # NaN and Infinity are not valid JSON; refuse them as Starlette's encoder did.
+    if indent:
+        return json.dumps(obj, ensure_ascii=False, allow_nan=False, indent=2).encode("utf-8")
+    return json.dumps(
+        obj, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
@@ -1,6 +1,10 @@
 """Shared configuration constants for datarails-open."""
 from __future__ import annotations
 
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+
 API_KEY_ENV = "DATARAILS_OPEN_API_KEY"
 API_BASE_ENV = "DATARAILS_OPEN_API_BASE"
 MODEL_ENV = "DATARAILS_OPEN_MODEL"
@@ -9,3 +13,26 @@ API_MODE_ENV = "DATARAILS_OPEN_API_MODE"
 DEFAULT_API_BASE = "https://api.openai.com/v1"
 DEFAULT_MODEL = "gpt-4o-mini"
 DEFAULT_API_MODE = "chat-completions"
+
+
+@dataclass(frozen=True)
+class AIDefaults:
+    """AI endpoint settings resolved from the environment and built-in defaults."""
+
+    api_base: str
+    model: str
+    mode: str
+
+
+@lru_cache(maxsize=1)
+def ai_defaults() -> AIDefaults:
+    """Return the environment-derived AI defaults, read once per process.
+
+    API keys are deliberately not cached so they can be rotated at runtime;
+    call ``ai_defaults.cache_clear()`` after changing the other variables.
+    """
+    return AIDefaults(
+        api_base=os.environ.get(API_BASE_ENV) or DEFAULT_API_BASE,
+        model=os.environ.get(MODEL_ENV) or DEFAULT_MODEL,
+        mode=os.environ.get(API_MODE_ENV) or DEFAULT_API_MODE,
+    )
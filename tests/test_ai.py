@@ -1,11 +1,20 @@
+import asyncio
 import json
 
 import httpx
 import pytest
 
+from app import ai
 from app.ai import AIConfig, generate_insights
 
 
+@pytest.fixture(autouse=True)
+def _clear_response_cache():
+    ai.clear_response_cache()
+    yield
+    ai.clear_response_cache()
+
+
 def test_generate_insights_sends_structured_payload():
     captured: dict[str, object] = {}
 
@@ -69,7 +78,10 @@ def test_generate_insights_requires_api_key():
         generate_insights([], config)
 
 
-def test_generate_insights_raises_for_http_errors():
+def test_generate_insights_raises_for_http_errors(monkeypatch: pytest.MonkeyPatch):
+    delays: list[float] = []
+    monkeypatch.setattr(ai.time, "sleep", delays.append)
+
     def handler(request: httpx.Request) -> httpx.Response:
         return httpx.Response(500, json={"error": "server error"}, request=request)
 
@@ -79,6 +91,66 @@ def test_generate_insights_raises_for_http_errors():
 
     with pytest.raises(httpx.HTTPStatusError):
         generate_insights([], config, client=client)
+    assert len(delays) == config.max_retries
+
+
+def test_generate_insights_retries_rate_limited_requests(monkeypatch: pytest.MonkeyPatch):
+    delays: list[float] = []
+    monkeypatch.setattr(ai.time, "sleep", delays.append)
+    responses = [
+        httpx.Response(429, headers={"Retry-After": "2"}),
+        httpx.Response(503),
+        httpx.Response(200, json={"choices": [{"message": {"content": "Recovered."}}]}),
+    ]
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return responses.pop(0)
+
+    transport = httpx.MockTransport(handler)
+    client = httpx.Client(base_url="https://mock.api/v1", transport=transport)
+    config = AIConfig(
+        api_key="test-key",
+        api_base="https://mock.api/v1",
+        model="demo-model",
+        retry_backoff=0.1,
+    )
+
+    assert generate_insights([], config, client=client) == "Recovered."
+    assert delays[0] == 2.0
+    assert 0.2 <= delays[1] <= 0.3
+    assert responses == []
+
+
+@pytest.mark.parametrize(
+    ("retry_after", "low", "high"),
+    [("-1", 0.0, 0.0), ("nan", 0.1, 0.2), ("inf", 0.1, 0.2), ("soon", 0.1, 0.2)],
+    ids=["negative", "nan", "infinite", "non-numeric"],
+)
+def test_generate_insights_sanitises_retry_after(
+    monkeypatch: pytest.MonkeyPatch, retry_after: str, low: float, high: float
+):
+    delays: list[float] = []
+    monkeypatch.setattr(ai.time, "sleep", delays.append)
+    responses = [
+        httpx.Response(503, headers={"Retry-After": retry_after}),
+        httpx.Response(200, json={"choices": [{"message": {"content": "Recovered."}}]}),
+    ]
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return responses.pop(0)
+
+    transport = httpx.MockTransport(handler)
+    client = httpx.Client(base_url="https://mock.api/v1", transport=transport)
+    config = AIConfig(
+        api_key="test-key",
+        api_base="https://mock.api/v1",
+        model="demo-model",
+        retry_backoff=0.1,
+    )
+
+    assert generate_insights([], config, client=client) == "Recovered."
+    assert len(delays) == 1
+    assert low <= delays[0] <= high
 
 
 def test_generate_insights_supports_responses_mode():
@@ -120,3 +192,144 @@ def test_generate_insights_supports_responses_mode():
     payload = captured["json"]
     assert payload["model"] == "demo-model"
     assert payload["input"][0]["role"] == "system"
+
+
+def test_generate_insights_reuses_cached_response():
+    calls: list[str] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(str(request.url))
+        return httpx.Response(
+            200,
+            json={"choices": [{"message": {"content": "Cached narrative."}}]},
+        )
+
+    transport = httpx.MockTransport(handler)
+    client = httpx.Client(base_url="https://mock.api/v1", transport=transport)
+    config = AIConfig(api_key="test-key", api_base="https://mock.api/v1", model="demo-model")
+    records = [{"period": "2024-01", "variance": 10}]
+
+    first = generate_insights(records, config, client=client)
+    second = generate_insights(records, config, client=client)
+    other = generate_insights(records, config, prompt="Different prompt", client=client)
+
+    assert first == second == other == "Cached narrative."
+    assert len(calls) == 2
+    assert ai.insights_cache_key(records, config) != ai.insights_cache_key(
+        records, config, prompt="Different prompt"
+    )
+
+
+def test_pooled_client_is_reused_per_base_url():
+    try:
+        first = ai._get_client("https://mock.api/v1", 30.0)
+        assert ai._get_client("https://mock.api/v1", 30.0) is first
+        assert ai._get_client("https://other.api/v1", 30.0) is not first
+    finally:
+        ai.close_clients()
+
+    assert first.is_closed
+    assert ai._get_client("https://mock.api/v1", 30.0) is not first
+    ai.close_clients()
+
+
+def test_generate_insights_many_preserves_batch_order():
+    def handler(request: httpx.Request) -> httpx.Response:
+        payload = json.loads(request.content.decode("utf-8"))
+        department = "Sales" if "Sales" in payload["messages"][1]["content"] else "Marketing"
+        return httpx.Response(
+            200,
+            json={"choices": [{"message": {"content": f"{department} narrative"}}]},
+        )
+
+    config = AIConfig(api_key="test-key", api_base="https://mock.api/v1", model="demo-model")
+    batches = [
+        [{"department": "Sales", "variance": -200}],
+        [{"department": "Marketing", "variance": 50}],
+    ]
+
+    async def run() -> list[str]:
+        transport = httpx.MockTransport(handler)
+        async with httpx.AsyncClient(
+            base_url="https://mock.api/v1", transport=transport
+        ) as client:
+            return await ai.generate_insights_many(batches, config, client=client)
+
+    assert asyncio.run(run()) == ["Sales narrative", "Marketing narrative"]
+
+
+def test_format_records_fills_missing_keys_with_blanks():
+    records = [
+        {"period": "2024-01", "department": "Sales", "variance": -200},
+        {"period": "2024-02", "department": "Sales"},
+    ]
+
+    assert ai._format_records(records) == (
+        "period,department,variance\n2024-01,Sales,-200\n2024-02,Sales,"
+    )
+
+
+def test_format_records_renders_variance_schema_in_column_order():
+    # The prompt hash covers this text, so the layout must stay byte-stable.
+    records = [
+        {
+            "variance": 20.0,
+            "budget": 100.0,
+            "actual": 120.0,
+            "account": "Revenue",
+            "department": "Sales",
+            "period": "2024-01",
+        },
+        {
+            "period": "2024-01",
+            "department": "Sales",
+            "account": "Expenses",
+            "actual": -40.5,
+            "budget": 0.0,
+            "variance": -40.5,
+        },
+    ]
+
+    assert ai._format_records(records) == (
+        "period,department,account,actual,budget,variance\n"
+        "2024-01,Sales,Revenue,120.0,100.0,20.0\n"
+        "2024-01,Sales,Expenses,-40.5,0.0,-40.5"
+    )
+
+
+def test_remember_response_evicts_safely_across_threads(monkeypatch: pytest.MonkeyPatch):
+    import threading
+
+    monkeypatch.setattr(ai, "RESPONSE_CACHE_SIZE", 8)
+    errors: list[BaseException] = []
+
+    def remember(worker: int) -> None:
+        try:
+            for index in range(500):
+                ai._remember_response(f"{worker}-{index}", "text")
+        except BaseException as exc:  # pragma: no cover - reported below
+            errors.append(exc)
+
+    threads = [threading.Thread(target=remember, args=(worker,)) for worker in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(ai._response_cache) == 8
+
+
+def test_insights_cache_key_depends_on_normalised_api_base():
+    records = [{"period": "2024-01", "value": 1.0}]
+    base = AIConfig(api_key="k", model="gpt-test", api_base="https://one.test/v1")
+
+    same = ai.insights_cache_key(
+        records, AIConfig(api_key="k", model="gpt-test", api_base="https://one.test/v1/")
+    )
+    other = ai.insights_cache_key(
+        records, AIConfig(api_key="k", model="gpt-test", api_base="https://two.test/v1")
+    )
+
+    assert ai.insights_cache_key(records, base) == same
+    assert ai.insights_cache_key(records, base) != other
@@ -0,0 +1,129 @@
+import sqlite3
+
+import pytest
+
+from app import database
+
+
+def test_connection_uses_wal_journal(sqlite_connection):
+    journal_mode = sqlite_connection.execute("PRAGMA journal_mode").fetchone()[0]
+    synchronous = sqlite_connection.execute("PRAGMA synchronous").fetchone()[0]
+
+    assert journal_mode == "wal"
+    assert synchronous == 1  # NORMAL
+
+
+def test_connection_applies_cache_pragmas(sqlite_connection):
+    def pragma(name):
+        return sqlite_connection.execute(f"PRAGMA {name}").fetchone()[0]
+
+    assert pragma("temp_store") == 2  # MEMORY
+    assert pragma("cache_size") == -65536
+    assert pragma("journal_size_limit") == 67108864
+
+
+def test_connection_enables_sorter_threads(sqlite_connection):
+    threads = sqlite_connection.execute("PRAGMA threads").fetchone()[0]
+
+    # Builds compiled with SQLITE_MAX_WORKER_THREADS below our request clamp it.
+    assert 0 <= threads <= database.SORTER_THREADS
+
+
+def test_insert_rows_streams_generators(sqlite_connection):
+    rows = (
+        ("seed", "actual", "2024-01", "Sales", f"Account {idx}", float(idx), "USD", None)
+        for idx in range(3)
+    )
+
+    inserted = database.insert_rows(sqlite_connection, rows)
+
+    assert inserted == 3
+    assert not sqlite_connection.in_transaction
+    count = sqlite_connection.execute("SELECT COUNT(*) FROM financial_facts").fetchone()[0]
+    assert count == 3
+
+
+def test_insert_rows_chunked_counts_every_chunk(sqlite_connection):
+    rows = (
+        ("seed", "plan", "2024-01", "Sales", "Revenue", float(idx), "USD", None)
+        for idx in range(25)
+    )
+
+    inserted = database.insert_rows_chunked(sqlite_connection, rows, chunk_size=10)
+
+    assert inserted == 25
+    total = sqlite_connection.execute(
+        "SELECT COUNT(*) FROM financial_facts WHERE scenario = 'plan'"
+    ).fetchone()[0]
+    assert total == 25
+
+
+def test_get_connection_sets_journal_mode_once_per_path(tmp_path, monkeypatch):
+    db_path = tmp_path / "once.db"
+    database.init_db(db_path)
+    monkeypatch.setattr(database, "_wal_paths", set())
+
+    first = database.get_connection(db_path)
+    first.close()
+    assert str(db_path) in database._wal_paths
+
+    second = database.get_connection(db_path)
+    try:
+        assert second.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert second.execute("PRAGMA mmap_size").fetchone()[0] == 268435456
+    finally:
+        second.close()
+
+
+def test_migrations_index_financial_facts_for_reporting(sqlite_connection):
+    indexes = {
+        row["name"]
+        for row in sqlite_connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'financial_facts'"
+        )
+    }
+
+    assert "idx_financial_facts_reporting" in indexes
+    assert "idx_financial_facts_scenario" not in indexes
+
+
+def test_department_summary_reads_reporting_index(sqlite_connection):
+    plan = " ".join(
+        row["detail"]
+        for row in sqlite_connection.execute(
+            "EXPLAIN QUERY PLAN SELECT period, department, SUM(value) FROM financial_facts "
+            "WHERE scenario = ? GROUP BY period, department ORDER BY period, department",
+            ("actual",),
+        )
+    )
+
+    assert "COVERING INDEX idx_financial_facts_reporting" in plan
+    assert "TEMP B-TREE" not in plan
+
+
+def test_insert_rows_chunked_rolls_back_on_failure(sqlite_connection):
+    rows = [("seed", "plan", "2024-01", "Sales", "Revenue", 1.0, "USD", None)] * 3
+    rows.append(("seed", "plan", None, "Sales", "Revenue", 1.0, "USD", None))
+
+    with pytest.raises(sqlite3.IntegrityError):
+        database.insert_rows_chunked(sqlite_connection, rows, chunk_size=2)
+
+    assert not sqlite_connection.in_transaction
+    count = sqlite_connection.execute("SELECT COUNT(*) FROM financial_facts").fetchone()[0]
+    assert count == 0
+
+
+def test_bulk_insert_rows_handles_partial_chunks(sqlite_connection):
+    rows = (
+        ("seed", "plan", "2024-01", "Sales", f"Account {idx}", float(idx), "USD", None)
+        for idx in range(7)
+    )
+
+    inserted = database.bulk_insert_rows(sqlite_connection, rows, chunk_size=3)
+
+    assert inserted == 7
+    assert not sqlite_connection.in_transaction
+    stored = sqlite_connection.execute(
+        "SELECT account, value FROM financial_facts ORDER BY id"
+    ).fetchall()
+    assert [tuple(row) for row in stored] == [(f"Account {idx}", float(idx)) for idx in range(7)]
@@ -9,11 +9,22 @@ from openpyxl.worksheet.table import Table
 from app import excel_loader
 
 
-@pytest.fixture()
-def workbook_path(tmp_path: Path) -> Path:
-    wb = Workbook()
-    ws1 = wb.active
-    ws1.title = "Actuals"
+@pytest.fixture(params=["openpyxl", "calamine"])
+def reader_backend(request, monkeypatch: pytest.MonkeyPatch) -> str:
+    if request.param == "calamine":
+        if excel_loader.CalamineWorkbook is None:
+            pytest.skip("python-calamine is not installed")
+    else:
+        monkeypatch.setattr(excel_loader, "CalamineWorkbook", None)
+    return request.param
+
+
+@pytest.fixture(scope="module")
+def workbook_path(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    # Saved once per module: the tests only read it and openpyxl's save is slow.
+    # write_only streams rows to the package instead of building a cell grid.
+    wb = Workbook(write_only=True)
+    ws1 = wb.create_sheet("Actuals")
     ws1.append(["period", "department", "account", "value", "currency", "metadata"])
     ws1.append(["2024-01", "Sales", "Revenue", 1000, "USD", "Q1 actuals"])
 
@@ -22,20 +33,54 @@ def workbook_path(tmp_path: Path) -> Path:
     ws2.append(["2024-01", "Sales", "Revenue", 1200, "USD"])
     ws2.append(["2024-01", "Marketing", "Spend", -300, "USD"])
 
-    path = tmp_path / "financials.xlsx"
+    path = tmp_path_factory.mktemp("workbook") / "financials.xlsx"
     wb.save(path)
     wb.close()
     return path
 
 
-def test_read_workbook_multiple_sheets(workbook_path: Path) -> None:
+def test_read_workbook_multiple_sheets(workbook_path: Path, reader_backend: str) -> None:
     rows = excel_loader.read_workbook(workbook_path, sheets=["Actuals", "Budget"])
     assert len(rows) == 3
     assert rows[0] == ("2024-01", "Sales", "Revenue", 1000.0, "USD", "Q1 actuals")
     assert ("Marketing", "Spend") in {(row[1], row[2]) for row in rows}
 
 
-def test_read_workbook_missing_required_columns(tmp_path: Path) -> None:
+def test_read_workbook_keeps_requested_sheet_order(
+    workbook_path: Path, reader_backend: str
+) -> None:
+    forward = excel_loader.read_workbook(workbook_path, sheets=["Actuals", "Budget"])
+    reverse = excel_loader.read_workbook(workbook_path, sheets=["Budget", "Actuals"])
+    assert reverse == forward[1:] + forward[:1]
+
+
+@pytest.mark.parametrize(
+    "selection",
+    [{"sheets": ["Actuals"]}, {"sheets": ["Actuals", "Budget"]}],
+    ids=["single-sheet", "multi-sheet"],
+)
+def test_read_workbook_opens_workbooks_read_only(
+    workbook_path: Path, monkeypatch: pytest.MonkeyPatch, selection: dict
+) -> None:
+    monkeypatch.setattr(excel_loader, "CalamineWorkbook", None)
+    calls: list[dict] = []
+    original = excel_loader.load_workbook
+
+    def recording_load_workbook(*args, **kwargs):  # type: ignore[no-untyped-def]
+        calls.append(kwargs)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(excel_loader, "load_workbook", recording_load_workbook)
+
+    assert excel_loader.read_workbook(workbook_path, **selection)
+    assert len(calls) == len(selection["sheets"])
+    for kwargs in calls:
+        assert kwargs["read_only"] is True
+        assert kwargs["data_only"] is True
+        assert kwargs["keep_links"] is False
+
+
+def test_read_workbook_missing_required_columns(tmp_path: Path, reader_backend: str) -> None:
     wb = Workbook()
     ws = wb.active
     ws.title = "Data"
@@ -78,3 +123,57 @@ def test_load_workbook_file_inserts_rows(tmp_path: Path, sqlite_connection) -> N
     )
     stored = [tuple(row) for row in cursor.fetchall()]
     assert stored == [("2024-02", "Finance", "Cost", -150.0, "USD")]
+
+
+def test_normalised_rows_from_iterable_uses_header_positions() -> None:
+    header = ["Metadata", "", "Account", "Department", "Period", "Value", "Currency"]
+    rows = [
+        (None, "ignored", " Revenue ", "Sales", "2024-01", "1,250.5", None),
+        ("note", None, "Cost", "Finance", "2024-02", -150, "EUR"),
+        (None, None, "Cost", "Finance", "2024-03", 3),
+        (None, None, None, None, None, None, None),
+    ]
+
+    result = excel_loader._normalised_rows_from_iterable(header, rows)
+
+    assert result == [
+        ("2024-01", "Sales", "Revenue", 1250.5, "USD", ""),
+        ("2024-02", "Finance", "Cost", -150.0, "EUR", "note"),
+        ("2024-03", "Finance", "Cost", 3.0, "USD", ""),
+    ]
+
+
+def test_normalised_rows_from_iterable_defaults_missing_optional_columns() -> None:
+    header = ["Period", "Department", "Account", "Value"]
+    rows = [("2024-01", "Sales", "Revenue", 10), ("2024-02", "Sales", "Revenue", "2,000")]
+
+    result = excel_loader._normalised_rows_from_iterable(header, rows)
+
+    assert result == [
+        ("2024-01", "Sales", "Revenue", 10.0, "USD", ""),
+        ("2024-02", "Sales", "Revenue", 2000.0, "USD", ""),
+    ]
+
+
+def test_read_workbook_streams_tables_from_any_sheet(tmp_path: Path) -> None:
+    wb = Workbook()
+    notes = wb.active
+    notes.title = "Notes"
+    notes.append(["ignored"])
+    data = wb.create_sheet("Data")
+    data.append(["title row"])
+    data.append(["period", "department", "account", "value"])
+    data.append(["2024-01", "Sales", "Revenue", 10])
+    data.append(["2024-02", "Sales", "Revenue", 20])
+    data.add_table(Table(displayName="Facts", ref="A2:D4"))
+    path = tmp_path / "tables.xlsx"
+    wb.save(path)
+    wb.close()
+
+    assert excel_loader._table_refs(path) == {"Facts": ("Data", "A2:D4")}
+    assert excel_loader.read_workbook(path, tables=["Facts"]) == [
+        ("2024-01", "Sales", "Revenue", 10.0, "USD", ""),
+        ("2024-02", "Sales", "Revenue", 20.0, "USD", ""),
+    ]
+    with pytest.raises(ValueError, match="not in the selected sheets"):
+        excel_loader.read_workbook(path, sheets=["Notes"], tables=["Facts"])
@@ -0,0 +1,38 @@
+from app.insights_repository import InsightsRepository
+
+
+def _seed(repository: InsightsRepository) -> None:
+    for prompt, budget in (("Alpha", "Budget"), ("Beta", "Budget"), ("Gamma", "Forecast")):
+        repository.create(
+            actual="Actuals",
+            budget=budget,
+            prompt=prompt,
+            insights=f"Summary for {prompt}",
+            row_count=1,
+        )
+
+
+def test_list_returns_page_and_total(sqlite_connection):
+    repository = InsightsRepository(sqlite_connection)
+    _seed(repository)
+
+    records, total = repository.list(limit=2, offset=0)
+    assert total == 3
+    assert [record.prompt for record in records] == ["Gamma", "Beta"]
+
+    records, total = repository.list(budget="Budget", limit=1, offset=1)
+    assert total == 2
+    assert [record.prompt for record in records] == ["Alpha"]
+
+
+def test_list_reports_total_for_pages_past_the_end(sqlite_connection):
+    repository = InsightsRepository(sqlite_connection)
+    _seed(repository)
+
+    records, total = repository.list(limit=2, offset=10)
+    assert records == []
+    assert total == 3
+
+    records, total = repository.list(prompt="Missing", limit=2, offset=0)
+    assert records == []
+    assert total == 0
@@ -5,7 +5,15 @@ import pytest
 from app import loader
 
 
-def test_read_dataset_normalises_columns(tmp_path: Path):
+@pytest.fixture(params=["csv", "pandas"])
+def csv_backend(request, monkeypatch: pytest.MonkeyPatch) -> str:
+    if request.param == "pandas":
+        pytest.importorskip("pandas")
+        monkeypatch.setattr(loader, "PANDAS_MIN_BYTES", 0)
+    return request.param
+
+
+def test_read_dataset_normalises_columns(tmp_path: Path, csv_backend: str):
     data = """Period,Department,Account,Value\n2024-01,Sales,Revenue,100"""
     path = tmp_path / "sample.csv"
     path.write_text(data)
@@ -15,7 +23,25 @@ def test_read_dataset_normalises_columns(tmp_path: Path):
     assert rows == [("2024-01", "Sales", "Revenue", 100.0, "USD", "")]
 
 
-def test_read_dataset_missing_columns(tmp_path: Path):
+def test_read_dataset_strips_values_and_defaults_currency(tmp_path: Path, csv_backend: str):
+    path = tmp_path / "sample.csv"
+    path.write_text(
+        " Period ,Department,Account,Value,Currency,Metadata\n"
+        "2024-01 , Sales ,Revenue,\" 1,250.5 \",,note \n"
+        "2024-02,Sales,Revenue,-3,EUR,\n"
+        "2024-03,Sales,Revenue,1 000,USD,\n"
+    )
+
+    rows = loader.read_dataset(path)
+
+    assert rows == [
+        ("2024-01", "Sales", "Revenue", 1250.5, "USD", "note"),
+        ("2024-02", "Sales", "Revenue", -3.0, "EUR", ""),
+        ("2024-03", "Sales", "Revenue", 1000.0, "USD", ""),
+    ]
+
+
+def test_read_dataset_missing_columns(tmp_path: Path, csv_backend: str):
     path = tmp_path / "bad.csv"
     path.write_text("period,value\n2024-01,100")
 
@@ -23,9 +49,52 @@ def test_read_dataset_missing_columns(tmp_path: Path):
         loader.read_dataset(path)
 
 
+def test_read_dataset_ignores_surplus_fields(tmp_path: Path, csv_backend: str):
+    path = tmp_path / "extra.csv"
+    path.write_text(
+        "period,department,account,value\n"
+        "2024-Q1,Sales,Revenue,1000,5\n"
+        "2024-Q2,Sales,Revenue,7\n"
+    )
+
+    rows = loader.read_dataset(path)
+
+    assert rows == [
+        ("2024-Q1", "Sales", "Revenue", 1000.0, "USD", ""),
+        ("2024-Q2", "Sales", "Revenue", 7.0, "USD", ""),
+    ]
+
+
+def test_read_dataset_later_duplicate_header_wins(tmp_path: Path, csv_backend: str):
+    path = tmp_path / "duplicate.csv"
+    path.write_text("period,department,account,value,Value\n2024-01,Sales,Revenue,1,2\n")
+
+    rows = loader.read_dataset(path)
+
+    assert rows == [("2024-01", "Sales", "Revenue", 2.0, "USD", "")]
+
+
 def test_read_dataset_rejects_excel(tmp_path: Path):
     path = tmp_path / "data.xlsx"
     path.write_text("fake")
 
     with pytest.raises(ValueError):
         loader.read_dataset(path)
+
+
+def test_load_file_inserts_in_batches(tmp_path: Path, sqlite_connection):
+    path = tmp_path / "sample.csv"
+    path.write_text(
+        "period,department,account,value\n"
+        + "".join(f"2024-0{idx},Sales,Revenue,{idx}\n" for idx in range(1, 6))
+    )
+
+    summary = loader.load_file(
+        sqlite_connection, path, source="csv", scenario="actual", batch_size=2
+    )
+
+    assert summary.rows_loaded == 5
+    stored = sqlite_connection.execute(
+        "SELECT source, scenario, SUM(value) FROM financial_facts GROUP BY source, scenario"
+    ).fetchall()
+    assert [tuple(row) for row in stored] == [("csv", "actual", 15.0)]
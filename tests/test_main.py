@@ -0,0 +1,84 @@
+from pathlib import Path
+
+from app import database, main
+
+
+def test_print_table_pads_columns(capsys):
+    main._print_table(
+        ["period", "department", "total"],
+        [("2024-01", "Sales", 150.0), ("2024-01", "Marketing", -20.5)],
+    )
+
+    assert capsys.readouterr().out.splitlines() == [
+        "period  | department | total",
+        "--------+------------+------",
+        "2024-01 | Sales      | 150.0",
+        "2024-01 | Marketing  | -20.5",
+    ]
+
+
+def test_print_table_reports_empty_rows(capsys):
+    main._print_table(["period"], [])
+
+    assert capsys.readouterr().out == "(no data)\n"
+
+
+def test_report_command_streams_csv_output(tmp_path: Path, capsys):
+    db_path = tmp_path / "warehouse.db"
+    database.init_db(db_path)
+    conn = database.get_connection(db_path)
+    try:
+        database.insert_rows(
+            conn,
+            [
+                ("test", "actual", "2024-01", "Sales", "Revenue", 100.0, "USD", None),
+                ("test", "actual", "2024-01", "Sales", "Revenue", 50.0, "USD", None),
+            ],
+        )
+    finally:
+        conn.close()
+    output = tmp_path / "report.csv"
+
+    main.main(["--db", str(db_path), "report", "--output", str(output)])
+
+    assert output.read_text(encoding="utf-8").splitlines() == [
+        "period,department,total",
+        "2024-01,Sales,150.0",
+    ]
+    assert capsys.readouterr().out == f"Report written to {output}\n"
+
+
+def test_build_scenario_command_persists_and_exports(tmp_path: Path, capsys):
+    db_path = tmp_path / "warehouse.db"
+    database.init_db(db_path)
+    conn = database.get_connection(db_path)
+    try:
+        database.insert_rows(
+            conn,
+            [("test", "actual", "2024-01", "Sales", "Revenue", 100.0, "USD", None)],
+        )
+    finally:
+        conn.close()
+    output = tmp_path / "scenario.csv"
+
+    main.main(
+        [
+            "--db", str(db_path), "build-scenario",
+            "--source", "actual", "--target", "plan",
+            "--adjustment", "0.5", "--output", str(output),
+        ]
+    )
+
+    assert output.read_text(encoding="utf-8").splitlines() == [
+        "period,department,account,value,currency,metadata",
+        "2024-01,Sales,Revenue,150.0,USD,",
+    ]
+    conn = database.get_connection(db_path)
+    try:
+        stored = conn.execute(
+            "SELECT source, value FROM financial_facts WHERE scenario = 'plan'"
+        ).fetchall()
+    finally:
+        conn.close()
+    assert [tuple(row) for row in stored] == [("scenario:actual", 150.0)]
+    assert "stored in the database (1 rows)" in capsys.readouterr().out
@@ -1,19 +1,36 @@
 from __future__ import annotations
 
+import os
+import sqlite3
+import subprocess
+import sys
+import threading
+from contextlib import ExitStack
 from pathlib import Path
+from typing import Iterator
 
+import httpx
 import pytest
 from fastapi.testclient import TestClient
-from openpyxl import Workbook
 
+from app import ai, database
 from app.office_bridge import (
     BRIDGE_TOKEN_ENV,
+    CONNECTION_POOL_SIZE,
     ENCRYPTED_API_KEY_PATH,
+    MEMORY_DATABASE,
     SECRET_KEY_PATH,
+    BridgeService,
+    _get_cipher,
+    _normalise_path,
     create_app,
 )
 
 
+# Scenario pair every insights request in this module asks about.
+VARIANCE_REQUEST = {"actualScenario": "Actuals", "budgetScenario": "Budget"}
+
+
 def _write_sample_csv(path: Path) -> None:
     path.write_text(
         "period,department,account,value\n"
@@ -22,34 +39,121 @@ def _write_sample_csv(path: Path) -> None:
     )
 
 
-def _write_sample_workbook(path: Path) -> None:
-    workbook = Workbook()
-    sheet = workbook.active
-    sheet.title = "Data"
+@pytest.fixture(scope="module")
+def sample_workbook(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    # Saved once per module: the tests only read it and openpyxl's save is slow.
+    # write_only streams rows to the package instead of building a cell grid.
+    # openpyxl is imported here so CSV-only bridge tests never load it.
+    from openpyxl import Workbook
+
+    path = tmp_path_factory.mktemp("workbook") / "data.xlsx"
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Data")
     sheet.append(["period", "department", "account", "value"])
     sheet.append(["2024-Q1", "Sales", "Revenue", 1000])
     workbook.save(path)
     workbook.close()
+    return path
+
+
+def _load_sample_scenarios(client: TestClient, tmp_path: Path, *scenarios: str) -> None:
+    source = tmp_path / "data.csv"
+    _write_sample_csv(source)
+    for name in scenarios:
+        response = client.post(
+            "/load-data",
+            json={"path": str(source), "source": "csv", "scenario": name},
+        )
+        assert response.status_code == 200
 
 
 @pytest.fixture()
-def client(tmp_path: Path) -> TestClient:
-    db_path = tmp_path / "test.db"
-    ENCRYPTED_API_KEY_PATH.unlink(missing_ok=True)
-    SECRET_KEY_PATH.unlink(missing_ok=True)
-    app = create_app(database_path=db_path)
-    return TestClient(app)
+def fake_insights(monkeypatch: pytest.MonkeyPatch) -> list[dict[str, object]]:
+    # Stands in for the AI service and records every call it receives.
+    calls: list[dict[str, object]] = []
+
+    def fake_generate(rows, config, prompt=None, prepared=None):  # type: ignore[no-untyped-def]
+        calls.append({"rows": rows, "config": config, "prompt": prompt})
+        return f"Summary for {prompt or 'default'}"
 
+    monkeypatch.setattr("app.office_bridge.ai.generate_insights", fake_generate)
+    return calls
 
-def test_load_csv_and_refresh_report(client: TestClient, tmp_path: Path) -> None:
-    source = tmp_path / "actuals.csv"
-    _write_sample_csv(source)
+
+def _summary(client: TestClient, scenario: str) -> dict:
+    # Deliberately uncached: tests re-read the summary to observe writes.
+    response = client.get("/reports/summary", params={"scenario": scenario})
+    assert response.status_code == 200
+    return response.json()
+
+
+@pytest.fixture(autouse=True)
+def _package_secrets_untouched() -> Iterator[None]:
+    # Tests keep secrets under tmp_path; the process-wide default files must
+    # never change, which keeps this module safe to run alongside others.
+    before = (SECRET_KEY_PATH.exists(), ENCRYPTED_API_KEY_PATH.exists())
+    yield
+    assert (SECRET_KEY_PATH.exists(), ENCRYPTED_API_KEY_PATH.exists()) == before
+
+
+@pytest.fixture(scope="module")
+def _shared_client(tmp_path_factory: pytest.TempPathFactory) -> Iterator[TestClient]:
+    # One in-memory app serves the whole module; the client fixture resets it.
+    app = create_app(
+        database_path=MEMORY_DATABASE,
+        secret_dir=tmp_path_factory.mktemp("secrets"),
+    )
+    with TestClient(app) as shared:
+        yield shared
+
+
+@pytest.fixture()
+def client(
+    _shared_client: TestClient, monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> TestClient:
+    service: BridgeService = _shared_client.app.state.bridge_service
+    # Each test stores its API key under its own tmp_path, so nothing is
+    # shared with other tests, other workers or the installed package.
+    monkeypatch.setattr(service, "secret_key_path", tmp_path / SECRET_KEY_PATH.name)
+    monkeypatch.setattr(
+        service, "encrypted_api_key_path", tmp_path / ENCRYPTED_API_KEY_PATH.name
+    )
+    with service._transaction() as conn:
+        conn.execute("DELETE FROM financial_facts")
+        conn.execute("DELETE FROM ai_insights")
+    service._load_cache.clear()
+    return _shared_client
+
+
+@pytest.fixture()
+def seeded_scenarios(client: TestClient) -> None:
+    # Inserts the sample fact directly, skipping two /load-data round-trips.
+    service: BridgeService = client.app.state.bridge_service
+    with service._transaction() as conn:
+        database.insert_rows(
+            conn,
+            [
+                ("csv", name, "2024-Q1", "Sales", "Revenue", 1000.0, "USD", None)
+                for name in ("Actuals", "Budget")
+            ],
+        )
+
+
+@pytest.mark.parametrize("source", ["csv", "excel"])
+def test_load_file_and_refresh_report(
+    request: pytest.FixtureRequest, client: TestClient, tmp_path: Path, source: str
+) -> None:
+    if source == "csv":
+        path = tmp_path / "actuals.csv"
+        _write_sample_csv(path)
+    else:
+        path = request.getfixturevalue("sample_workbook")
 
     response = client.post(
         "/load-data",
         json={
-            "path": str(source),
-            "source": "csv", 
+            "path": str(path),
+            "source": source,
             "scenario": "Actuals",
         },
     )
@@ -58,25 +162,52 @@ def test_load_csv_and_refresh_report(client: TestClient, tmp_path: Path) -> None
     assert payload["rowsLoaded"] == 1
     assert payload["scenario"] == "Actuals"
 
-    report = client.get("/reports/summary", params={"scenario": "Actuals"}).json()
+    report = _summary(client, "Actuals")
     assert report["scenario"] == "Actuals"
     assert len(report["rows"]) == 1
     assert report["rows"][0]["department"] == "Sales"
     assert report["rows"][0]["total"] == 1000.0
 
 
-def test_scenarios_list_returns_unique_sorted(client: TestClient, tmp_path: Path) -> None:
-    source = tmp_path / "scenarios.csv"
+def test_load_data_skips_unchanged_file(client: TestClient, tmp_path: Path) -> None:
+    source = tmp_path / "actuals.csv"
     _write_sample_csv(source)
+    body = {"path": str(source), "source": "csv", "scenario": "Actuals"}
 
-    client.post(
-        "/load-data",
-        json={"path": str(source), "source": "csv", "scenario": "Actuals"},
-    )
-    client.post(
-        "/load-data",
-        json={"path": str(source), "source": "csv", "scenario": "Budget"},
-    )
+    first = client.post("/load-data", json=body)
+    second = client.post("/load-data", json=body)
+
+    assert first.json() == second.json()
+    report = _summary(client, "Actuals")
+    assert report["rows"][0]["total"] == 1000.0
+
+    stat = source.stat()
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    client.post("/load-data", json=body)
+
+    report = _summary(client, "Actuals")
+    assert report["rows"][0]["total"] == 2000.0
+
+
+def test_load_data_runs_on_bridge_load_pool(
+    monkeypatch: pytest.MonkeyPatch, client: TestClient
+) -> None:
+    threads: list[str] = []
+
+    def fake_load(self, request):  # type: ignore[no-untyped-def]
+        threads.append(threading.current_thread().name)
+        return {"rowsLoaded": 0}
+
+    monkeypatch.setattr(BridgeService, "load_data", fake_load)
+
+    response = client.post("/load-data", json={"path": "ignored.csv"})
+
+    assert response.status_code == 200
+    assert threads and threads[0].startswith("bridge-load")
+
+
+def test_scenarios_list_returns_unique_sorted(client: TestClient, tmp_path: Path) -> None:
+    _load_sample_scenarios(client, tmp_path, "Actuals", "Budget")
 
     response = client.get("/scenarios/list")
     assert response.status_code == 200
@@ -84,15 +215,21 @@ def test_scenarios_list_returns_unique_sorted(client: TestClient, tmp_path: Path
     assert payload == {"items": ["Actuals", "Budget"]}
 
 
-def test_export_scenario_persists_rows(client: TestClient, tmp_path: Path) -> None:
-    source = tmp_path / "base.csv"
-    _write_sample_csv(source)
+def test_responses_use_compact_bridge_encoder(client: TestClient, tmp_path: Path) -> None:
+    _load_sample_scenarios(client, tmp_path, "Actuals")
 
-    client.post(
-        "/load-data",
-        json={"path": str(source), "source": "csv", "scenario": "Actuals"},
+    response = client.get("/reports/summary", params={"scenario": "Actuals"})
+
+    assert response.headers["content-type"] == "application/json"
+    assert response.content == (
+        b'{"scenario":"Actuals","rows":'
+        b'[{"period":"2024-Q1","department":"Sales","total":1000.0}]}'
     )
 
+
+def test_export_scenario_persists_rows(client: TestClient, tmp_path: Path) -> None:
+    _load_sample_scenarios(client, tmp_path, "Actuals")
+
     response = client.post(
         "/scenarios/export",
         json={
@@ -107,7 +244,7 @@ def test_export_scenario_persists_rows(client: TestClient, tmp_path: Path) -> No
     assert pytest.approx(payload["rows"][0]["value"], rel=1e-5) == 1100.0
     assert "Persisted 1 rows" in payload["message"]
 
-    forecast = client.get("/reports/summary", params={"scenario": "Forecast"}).json()
+    forecast = _summary(client, "Forecast")
     assert len(forecast["rows"]) == 1
     assert pytest.approx(forecast["rows"][0]["total"], rel=1e-5) == 1100.0
 
@@ -160,76 +297,38 @@ def test_load_csv_missing_required_columns_returns_400(
     assert "Missing required columns" in response.json()["detail"]
 
 
-def test_load_xlsx_missing_sheet_returns_400(
-    client: TestClient, tmp_path: Path
-) -> None:
-    workbook_path = tmp_path / "data.xlsx"
-    _write_sample_workbook(workbook_path)
-
-    response = client.post(
-        "/load-data",
-        json={
-            "path": str(workbook_path),
-            "source": "excel",
-            "scenario": "Actuals",
-            "sheets": ["NotPresent"],
-        },
-    )
-
-    assert response.status_code == 400
-    assert "Worksheet 'NotPresent' not found" in response.json()["detail"]
-
-
-def test_load_xlsx_missing_table_returns_400(
-    client: TestClient, tmp_path: Path
+@pytest.mark.parametrize(
+    ("selection", "message"),
+    [
+        ({"sheets": ["NotPresent"]}, "Worksheet 'NotPresent' not found"),
+        ({"tables": ["MissingTable"]}, "Table 'MissingTable' not found"),
+    ],
+    ids=["missing-sheet", "missing-table"],
+)
+def test_load_xlsx_missing_selection_returns_400(
+    client: TestClient, sample_workbook: Path, selection: dict, message: str
 ) -> None:
-    workbook_path = tmp_path / "data.xlsx"
-    _write_sample_workbook(workbook_path)
-
     response = client.post(
         "/load-data",
         json={
-            "path": str(workbook_path),
+            "path": str(sample_workbook),
             "source": "excel",
             "scenario": "Actuals",
-            "tables": ["MissingTable"],
+            **selection,
         },
     )
 
     assert response.status_code == 400
-    assert "Table 'MissingTable' not found" in response.json()["detail"]
+    assert message in response.json()["detail"]
 
 
 def test_generate_insights_route_returns_summary(
-    monkeypatch: pytest.MonkeyPatch, client: TestClient, tmp_path: Path
+    client: TestClient, seeded_scenarios: None, fake_insights: list[dict[str, object]]
 ) -> None:
-    source = tmp_path / "data.csv"
-    _write_sample_csv(source)
-
-    client.post(
-        "/load-data",
-        json={"path": str(source), "source": "csv", "scenario": "Actuals"},
-    )
-    client.post(
-        "/load-data",
-        json={"path": str(source), "source": "csv", "scenario": "Budget"},
-    )
-
-    captured: dict[str, object] = {}
-
-    def fake_generate_insights(rows, config, prompt=None):  # type: ignore[no-untyped-def]
-        captured["rows"] = rows
-        captured["config"] = config
-        captured["prompt"] = prompt
-        return "Variance summary"
-
-    monkeypatch.setattr("app.office_bridge.ai.generate_insights", fake_generate_insights)
-
     response = client.post(
         "/insights/variance",
         json={
-            "actualScenario": "Actuals",
-            "budgetScenario": "Budget",
+            **VARIANCE_REQUEST,
             "prompt": "Explain the movement",
             "includeRows": True,
             "api": {
@@ -243,11 +342,12 @@ def test_generate_insights_route_returns_summary(
 
     payload = response.json()
     assert response.status_code == 200
-    assert payload["insights"] == "Variance summary"
+    assert payload["insights"] == "Summary for Explain the movement"
     assert payload["rowCount"] == 1
     assert payload["rows"][0]["account"] == "Revenue"
-    assert captured["prompt"] == "Explain the movement"
-    config = captured["config"]
+    (call,) = fake_insights
+    assert call["prompt"] == "Explain the movement"
+    config = call["config"]
     assert config.api_key == "test-key"
     assert config.api_base == "https://example.test/v1"
     assert config.model == "gpt-test"
@@ -261,87 +361,158 @@ def test_generate_insights_route_returns_summary(
     assert history["items"][0]["rowCount"] == 1
 
 
+@pytest.fixture(scope="module")
+def history_client(tmp_path_factory: pytest.TempPathFactory) -> Iterator[TestClient]:
+    # A separate app seeded once with three insights; the tests only read it.
+    app = create_app(
+        database_path=MEMORY_DATABASE,
+        secret_dir=tmp_path_factory.mktemp("history-secrets"),
+    )
+    service: BridgeService = app.state.bridge_service
+    with service._transaction() as conn:
+        database.insert_rows(
+            conn,
+            [
+                ("csv", name, "2024-Q1", "Sales", "Revenue", 1000.0, "USD", None)
+                for name in ("Actuals", "Budget")
+            ],
+        )
+    with TestClient(app) as history:
+        with pytest.MonkeyPatch.context() as patch:
+            patch.setattr(
+                "app.office_bridge.ai.generate_insights",
+                lambda rows, config, prompt=None, prepared=None: f"Summary for {prompt}",
+            )
+            for prompt in ("Alpha", "Beta", "Gamma"):
+                response = history.post(
+                    "/insights/variance",
+                    json={
+                        **VARIANCE_REQUEST,
+                        "prompt": prompt,
+                        "api": {"apiKey": "test-key"},
+                    },
+                )
+                assert response.status_code == 200
+        yield history
+
+
+@pytest.mark.parametrize(
+    ("params", "total", "items"),
+    [
+        ({"page": 1, "pageSize": 2}, 3, 2),
+        ({"page": 2, "pageSize": 2}, 3, 1),
+        ({"page": 5, "pageSize": 2}, 3, 0),
+        ({"actual": "Actuals", "prompt": "Beta"}, 1, 1),
+    ],
+    ids=["first-page", "second-page", "past-end", "prompt-filter"],
+)
 def test_insights_history_filters_and_pagination(
-    monkeypatch: pytest.MonkeyPatch, client: TestClient, tmp_path: Path
+    history_client: TestClient, params: dict, total: int, items: int
 ) -> None:
-    source = tmp_path / "data.csv"
-    _write_sample_csv(source)
+    page = history_client.get("/insights/history", params=params).json()
 
-    client.post(
-        "/load-data",
-        json={"path": str(source), "source": "csv", "scenario": "Actuals"},
-    )
-    client.post(
-        "/load-data",
-        json={"path": str(source), "source": "csv", "scenario": "Budget"},
-    )
+    assert page["page"] == params.get("page", 1)
+    assert page["total"] == total
+    assert len(page["items"]) == items
+    if "pageSize" in params:
+        assert page["pageSize"] == params["pageSize"]
+    if "prompt" in params:
+        assert [item["prompt"] for item in page["items"]] == [params["prompt"]]
 
-    def fake_generate(rows, config, prompt=None):  # type: ignore[no-untyped-def]
-        return f"Summary for {prompt or 'default'}"
 
-    monkeypatch.setattr("app.office_bridge.ai.generate_insights", fake_generate)
+def test_generate_insights_reuses_stored_response(
+    client: TestClient, seeded_scenarios: None, fake_insights: list[dict[str, object]]
+) -> None:
+    body = {
+        **VARIANCE_REQUEST,
+        "prompt": "Repeat me",
+        "api": {"apiKey": "test-key"},
+    }
+    first = client.post("/insights/variance", json=body)
+    second = client.post("/insights/variance", json=body)
+
+    assert first.status_code == second.status_code == 200
+    assert second.json()["insights"] == "Summary for Repeat me"
+    assert [call["prompt"] for call in fake_insights] == ["Repeat me"]
+    assert client.get("/insights/history").json()["total"] == 2
+
+
+def test_generate_insights_builds_prompt_once_on_cache_miss(
+    monkeypatch: pytest.MonkeyPatch, client: TestClient, seeded_scenarios: None
+) -> None:
+    ai.clear_response_cache()
+    built: list[object] = []
+    original_build = ai._build_messages
 
-    prompts = ["Alpha", "Beta", "Gamma"]
-    for prompt in prompts:
-        response = client.post(
-            "/insights/variance",
-            json={
-                "actualScenario": "Actuals",
-                "budgetScenario": "Budget",
-                "prompt": prompt,
-                "api": {"apiKey": "test-key"},
-            },
+    def counting_build(records, prompt):  # type: ignore[no-untyped-def]
+        built.append(prompt)
+        return original_build(records, prompt)
+
+    transport = httpx.MockTransport(
+        lambda request: httpx.Response(
+            200, json={"choices": [{"message": {"content": "Fresh summary"}}]}
         )
-        assert response.status_code == 200
+    )
+    http_client = httpx.Client(base_url="https://mock.api/v1", transport=transport)
+    original_generate = ai.generate_insights
 
-    first_page = client.get(
-        "/insights/history",
-        params={"page": 1, "pageSize": 2},
-    ).json()
-    assert first_page["page"] == 1
-    assert first_page["pageSize"] == 2
-    assert first_page["total"] == 3
-    assert len(first_page["items"]) == 2
-
-    second_page = client.get(
-        "/insights/history",
-        params={"page": 2, "pageSize": 2},
-    ).json()
-    assert second_page["page"] == 2
-    assert len(second_page["items"]) == 1
-
-    beta_only = client.get(
-        "/insights/history",
-        params={"actual": "Actuals", "prompt": "Beta"},
-    ).json()
-    assert beta_only["total"] == 1
-    assert beta_only["items"][0]["prompt"] == "Beta"
+    def generate_with_mock(rows, config, prompt=None, prepared=None):  # type: ignore[no-untyped-def]
+        return original_generate(
+            rows, config, prompt=prompt, prepared=prepared, client=http_client
+        )
 
+    monkeypatch.setattr(ai, "_build_messages", counting_build)
+    monkeypatch.setattr("app.office_bridge.ai.generate_insights", generate_with_mock)
 
-def test_store_api_key_and_generate_without_payload(
+    response = client.post(
+        "/insights/variance",
+        json={**VARIANCE_REQUEST, "prompt": "Once", "api": {"apiKey": "test-key"}},
+    )
+
+    assert response.status_code == 200
+    assert response.json()["insights"] == "Fresh summary"
+    assert built == ["Once"]
+
+
+def test_generate_insights_uses_one_connection(
     monkeypatch: pytest.MonkeyPatch, client: TestClient, tmp_path: Path
 ) -> None:
-    source = tmp_path / "data.csv"
-    _write_sample_csv(source)
+    _load_sample_scenarios(client, tmp_path, "Actuals")
 
-    client.post(
-        "/load-data",
-        json={"path": str(source), "source": "csv", "scenario": "Actuals"},
+    opened: list[object] = []
+    original = BridgeService._connection
+
+    def counting_connection(self):  # type: ignore[no-untyped-def]
+        conn = original(self)
+        opened.append(conn)
+        return conn
+
+    monkeypatch.setattr(BridgeService, "_connection", counting_connection)
+    monkeypatch.setattr(
+        "app.office_bridge.ai.generate_insights",
+        lambda rows, config, prompt=None, prepared=None: "Summary",
     )
-    client.post(
-        "/load-data",
-        json={"path": str(source), "source": "csv", "scenario": "Budget"},
+
+    response = client.post(
+        "/insights/variance",
+        json={
+            **VARIANCE_REQUEST,
+            "api": {"apiKey": "test-key"},
+        },
     )
 
-    captured: dict[str, object] = {}
+    assert response.status_code == 200
+    assert len(opened) == 1
+    assert client.get("/insights/history").json()["total"] == 1
 
-    def fake_generate_insights(rows, config, prompt=None):  # type: ignore[no-untyped-def]
-        captured["rows"] = rows
-        captured["config"] = config
-        captured["prompt"] = prompt
-        return "Variance summary"
 
-    monkeypatch.setattr("app.office_bridge.ai.generate_insights", fake_generate_insights)
+def test_store_api_key_and_generate_without_payload(
+    monkeypatch: pytest.MonkeyPatch,
+    client: TestClient,
+    tmp_path: Path,
+    seeded_scenarios: None,
+    fake_insights: list[dict[str, object]],
+) -> None:
     monkeypatch.setenv(BRIDGE_TOKEN_ENV, "bridge-secret")
 
     response = client.post(
@@ -350,20 +521,21 @@ def test_store_api_key_and_generate_without_payload(
         headers={"Authorization": "Bearer bridge-secret"},
     )
     assert response.status_code == 204
+    assert (tmp_path / ENCRYPTED_API_KEY_PATH.name).exists()
 
     response = client.post(
         "/insights/variance",
         json={
-            "actualScenario": "Actuals",
-            "budgetScenario": "Budget",
+            **VARIANCE_REQUEST,
             "includeRows": False,
         },
     )
 
     assert response.status_code == 200
-    config = captured["config"]
+    (call,) = fake_insights
+    config = call["config"]
     assert config.api_key == "stored-key"
-    assert response.json()["insights"] == "Variance summary"
+    assert response.json()["insights"] == "Summary for default"
 
 
 def test_generate_insights_missing_key_returns_400(
@@ -373,8 +545,187 @@ def test_generate_insights_missing_key_returns_400(
 
     response = client.post(
         "/insights/variance",
-        json={"actualScenario": "Actuals", "budgetScenario": "Budget"},
+        json=VARIANCE_REQUEST,
     )
 
     assert response.status_code == 400
     assert "/settings/api-key" in response.json()["detail"]
+
+
+def test_generate_insights_without_scenario_data_returns_400(
+    monkeypatch: pytest.MonkeyPatch, client: TestClient
+) -> None:
+    def fail_generate(rows, config, prompt=None, prepared=None):  # type: ignore[no-untyped-def]
+        raise AssertionError("AI service should not be called without data")
+
+    monkeypatch.setattr("app.office_bridge.ai.generate_insights", fail_generate)
+
+    response = client.post(
+        "/insights/variance",
+        json={
+            **VARIANCE_REQUEST,
+            "api": {"apiKey": "test-key"},
+        },
+    )
+
+    assert response.status_code == 400
+    assert "has any data" in response.json()["detail"]
+    assert client.get("/insights/history").json()["total"] == 0
+
+
+def test_bridge_service_runs_migrations_once(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    calls: list[object] = []
+    original = database.run_migrations
+    monkeypatch.setattr(
+        database,
+        "run_migrations",
+        lambda conn: calls.append(conn) or original(conn),
+    )
+    service = BridgeService(database_path=tmp_path / "test.db")
+
+    for _ in range(3):
+        service.list_scenarios()
+
+    assert len(calls) == 2  # once from init_db, once for the service
+
+
+def test_cipher_is_shared_until_key_file_changes(tmp_path: Path) -> None:
+    key_path = tmp_path / SECRET_KEY_PATH.name
+    first = _get_cipher(key_path)
+
+    assert _get_cipher(key_path) is first
+
+    key_path.unlink()
+    replacement = _get_cipher(key_path)
+    assert replacement is not first
+    assert key_path.exists()
+
+
+def test_store_api_key_rejects_wrong_token(
+    monkeypatch: pytest.MonkeyPatch, client: TestClient
+) -> None:
+    monkeypatch.setenv(BRIDGE_TOKEN_ENV, "bridge-secret")
+
+    wrong = client.post(
+        "/settings/api-key",
+        json={"apiKey": "stored-key"},
+        headers={"Authorization": "Bearer bridge-secreT"},
+    )
+    missing = client.post("/settings/api-key", json={"apiKey": "stored-key"})
+
+    assert wrong.status_code == missing.status_code == 401
+    service: BridgeService = client.app.state.bridge_service
+    assert not service.encrypted_api_key_path.exists()
+
+
+def test_normalise_path_resolves_relative_and_home_paths(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("HOME", str(tmp_path / "home"))
+
+    assert _normalise_path(str(tmp_path / "a.csv")) == tmp_path / "a.csv"
+    assert _normalise_path("data/a.csv") == tmp_path / "data" / "a.csv"
+    assert _normalise_path("~/a.csv") == tmp_path / "home" / "a.csv"
+
+
+def test_bridge_import_defers_openpyxl() -> None:
+    code = "import sys, app.office_bridge; sys.exit('openpyxl' in sys.modules)"
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=Path(__file__).resolve().parents[1],
+    )
+    assert result.returncode == 0
+
+
+def test_bridge_service_reuses_pooled_connections(tmp_path: Path) -> None:
+    service = BridgeService(database_path=tmp_path / "test.db", pool_size=1)
+
+    with service._connection() as first:
+        pass
+    with service._connection() as again:
+        assert again is first
+        with service._connection() as overflow:
+            assert overflow is not first
+
+    # The overflow connection went back first, so the full pool closed ``first``.
+    with service._connection() as pooled:
+        assert pooled is overflow
+
+    service.close()
+    with service._connection() as fresh:
+        assert fresh is not overflow
+    service.close()
+
+
+def test_bridge_service_shares_one_in_memory_database() -> None:
+    service = BridgeService(database_path=MEMORY_DATABASE, pool_size=1)
+    row = ("csv", "Actuals", "2024-Q1", "Sales", "Revenue", 1.0, "USD", None)
+
+    with service._transaction() as conn:
+        conn.execute(database.INSERT_FACT_SQL, row)
+    service.close()
+    with service._connection() as first, service._connection() as second:
+        assert first is not second
+        for conn in (first, second):
+            (count,) = conn.execute("SELECT COUNT(*) FROM financial_facts").fetchone()
+            assert count == 1
+    service.close()
+    assert not Path(MEMORY_DATABASE).exists()
+
+
+def test_bridge_service_dispose_releases_in_memory_database() -> None:
+    service = BridgeService(database_path=MEMORY_DATABASE, pool_size=1)
+    with service._connection() as conn:
+        conn.execute("SELECT 1")
+    memory_uri = service._memory_uri
+    assert memory_uri is not None
+
+    service.dispose()
+
+    probe = sqlite3.connect(memory_uri, uri=True)
+    try:
+        (tables,) = probe.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+    finally:
+        probe.close()
+    assert tables == 0
+
+
+def test_bridge_service_transaction_commits_or_rolls_back(tmp_path: Path) -> None:
+    service = BridgeService(database_path=tmp_path / "test.db", pool_size=1)
+    row = ("csv", "Actuals", "2024-Q1", "Sales", "Revenue", 1.0, "USD", None)
+
+    with service._transaction() as conn:
+        conn.execute(database.INSERT_FACT_SQL, row)
+    with pytest.raises(RuntimeError):
+        with service._transaction() as conn:
+            conn.execute(database.INSERT_FACT_SQL, row)
+            raise RuntimeError("boom")
+
+    with service._connection() as conn:
+        assert not conn.in_transaction
+        (count,) = conn.execute("SELECT COUNT(*) FROM financial_facts").fetchone()
+    service.close()
+    assert count == 1
+
+
+def test_bridge_service_keeps_at_most_pool_size_idle_connections(tmp_path: Path) -> None:
+    service = BridgeService(database_path=tmp_path / "test.db")
+
+    with ExitStack() as stack:
+        for _ in range(CONNECTION_POOL_SIZE + 2):
+            stack.enter_context(service._connection())
+
+    assert service._pool.qsize() == CONNECTION_POOL_SIZE
+    service.close()
+
+
+def test_lifespan_shutdown_closes_pooled_ai_clients(tmp_path: Path) -> None:
+    with TestClient(create_app(database_path=tmp_path / "test.db")):
+        http_client = ai._get_client("https://example.test/v1", 30.0)
+        assert not http_client.is_closed
+    assert http_client.is_closed
+    assert ai._get_client("https://example.test/v1", 30.0) is not http_client
+    ai.close_clients()
@@ -1,4 +1,8 @@
+import sqlite3
 from pathlib import Path
+from typing import Iterator
+
+import pytest
 
 from app import database, loader, reporting
 
@@ -34,38 +38,74 @@ def write_sample_files(tmp_path: Path) -> None:
     )
 
 
-def test_summarise_by_department(tmp_path: Path):
+@pytest.fixture(scope="module")
+def seeded_db(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    # Every test here only reads, so the database is seeded once per module.
+    tmp_path = tmp_path_factory.mktemp("reporting")
     write_sample_files(tmp_path)
-    db_path = prepare_db(tmp_path)
+    return prepare_db(tmp_path)
 
-    conn = database.get_connection(db_path)
+
+@pytest.fixture()
+def conn(seeded_db: Path) -> Iterator[sqlite3.Connection]:
+    # Read-only so a test that writes fails instead of leaking into the others.
+    connection = sqlite3.connect(f"file:{seeded_db}?mode=ro", uri=True)
     try:
-        rows = reporting.summarise_by_department(conn)
+        yield connection
     finally:
-        conn.close()
+        connection.close()
 
-    assert rows == [("2024-01", "Sales", 150.0)]
 
-    conn = database.get_connection(db_path)
-    try:
-        filtered = reporting.summarise_by_department(conn, scenario="actual")
-    finally:
-        conn.close()
+def test_summarise_by_department(conn: sqlite3.Connection):
+    assert reporting.summarise_by_department(conn) == [("2024-01", "Sales", 150.0)]
+    assert reporting.summarise_by_department(conn, scenario="actual") == [
+        ("2024-01", "Sales", 80.0)
+    ]
 
-    assert filtered == [("2024-01", "Sales", 80.0)]
 
+def test_variance_report(conn: sqlite3.Connection):
+    rows = reporting.variance_report(conn, actual_scenario="actual", budget_scenario="budget")
 
-def test_variance_report(tmp_path: Path):
-    write_sample_files(tmp_path)
-    db_path = prepare_db(tmp_path)
+    by_account = {row[2]: row for row in rows}
+    assert len(by_account) == len(rows)
+    assert by_account["Revenue"][3:] == (120.0, 100.0, 20.0)
+    assert by_account["Expenses"][3:] == (-40.0, -30.0, -10.0)
 
-    conn = database.get_connection(db_path)
-    try:
-        rows = reporting.variance_report(conn, actual_scenario="actual", budget_scenario="budget")
-    finally:
-        conn.close()
 
-    revenue_row = next(row for row in rows if row[2] == "Revenue")
-    assert revenue_row[3] == 120.0
-    assert revenue_row[4] == 100.0
-    assert revenue_row[5] == 20.0
+def test_variance_report_yields_floats_for_missing_scenario(conn: sqlite3.Connection):
+    rows = list(
+        reporting.iter_variance_report(conn, actual_scenario="actual", budget_scenario="forecast")
+    )
+
+    assert rows
+    for row in rows:
+        assert type(row) is tuple
+        assert row[4] == 0.0 and type(row[4]) is float
+        assert row[5] == row[3]
+
+
+def test_variance_report_skips_query_when_both_scenarios_missing(conn: sqlite3.Connection):
+    statements: list[str] = []
+    conn.set_trace_callback(statements.append)
+
+    assert reporting.scenarios_present(conn, "actual", "forecast") == (True, False)
+    statements.clear()
+    rows = reporting.variance_report(
+        conn, actual_scenario="plan", budget_scenario="forecast", check_presence=True
+    )
+
+    assert rows == []
+    assert len(statements) == 1
+    assert "EXISTS" in statements[0]
+
+
+def test_iter_variance_report_skips_presence_probe_by_default(conn: sqlite3.Connection):
+    statements: list[str] = []
+    conn.set_trace_callback(statements.append)
+
+    rows = list(
+        reporting.iter_variance_report(conn, actual_scenario="actual", budget_scenario="budget")
+    )
+
+    assert rows
+    assert not any("EXISTS" in statement for statement in statements)
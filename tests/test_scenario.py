@@ -1,4 +1,6 @@
-from app import scenario
+import pytest
+
+from app import database, scenario
 
 
 def test_apply_adjustments_percentage():
@@ -13,3 +15,107 @@ def test_apply_adjustments_percentage():
 
     assert result[0][3] == 1100.0
     assert result[1][3] == 500.0
+
+
+def test_apply_adjustments_compounds_matching_rules_case_insensitively():
+    rows = [
+        ("2024-01", "Sales", "Revenue", 1000.0, "USD", ""),
+        ("2024-02", "sales", "REVENUE", 200.0, "USD", "note"),
+        ("2024-02", "Sales", "Expenses", 50.0, "USD", ""),
+    ]
+    adjustments = [
+        scenario.ScenarioAdjustment(department="SALES", percentage_change=0.1),
+        scenario.ScenarioAdjustment(account="revenue", percentage_change=-0.5),
+    ]
+
+    result = scenario.apply_adjustments(rows, adjustments)
+
+    assert result == [
+        ("2024-01", "Sales", "Revenue", 1000.0 * 1.1 * 0.5, "USD", ""),
+        ("2024-02", "sales", "REVENUE", 200.0 * 1.1 * 0.5, "USD", "note"),
+        ("2024-02", "Sales", "Expenses", 50.0 * 1.1, "USD", ""),
+    ]
+
+
+def test_apply_adjustments_scales_many_rows_and_passes_through_untouched():
+    rows = [
+        ("2024-01", "Sales" if i % 2 else "Finance", "Revenue", float(i), "USD", "")
+        for i in range(10_000)
+    ]
+    adjustments = [scenario.ScenarioAdjustment(department="Sales", percentage_change=0.1)]
+
+    result = scenario.apply_adjustments(rows, adjustments)
+
+    assert len(result) == len(rows)
+    assert result[1] == ("2024-01", "Sales", "Revenue", 1.0 * 1.1, "USD", "")
+    assert result[9_999][3] == 9_999.0 * 1.1
+    assert all(result[i] is rows[i] for i in range(0, 10_000, 2))
+
+
+@pytest.mark.parametrize(
+    "adjustments",
+    [
+        [],
+        [scenario.ScenarioAdjustment(percentage_change=0.25)],
+        [
+            scenario.ScenarioAdjustment(department="SALES", percentage_change=0.1),
+            scenario.ScenarioAdjustment(department="sales", account="revenue", percentage_change=-0.3),
+        ],
+        [scenario.ScenarioAdjustment(department="Études", percentage_change=0.5)],
+    ],
+    ids=["none", "global", "compound", "non-ascii"],
+)
+def test_build_scenario_matches_python_adjustments(sqlite_connection, adjustments):
+    database.insert_rows(
+        sqlite_connection,
+        [
+            ("seed", "actual", "2024-01", "Sales", "Revenue", 1000.0, "USD", None),
+            ("seed", "actual", "2024-01", "sales", "Expenses", -40.5, "USD", "note"),
+            ("seed", "actual", "2024-02", "Études", "Revenue", 10.0, "EUR", None),
+            ("seed", "budget", "2024-01", "Sales", "Revenue", 999.0, "USD", None),
+        ],
+    )
+
+    result = scenario.build_scenario(
+        sqlite_connection, source_scenario="actual", adjustments=adjustments
+    )
+
+    expected = scenario.apply_adjustments(
+        scenario.fetch_dataset(sqlite_connection, "actual"), adjustments
+    )
+    assert result == expected
+    assert len(result) == 3
+
+
+def test_scenario_adjustment_is_immutable_and_compares_by_fields():
+    adjustment = scenario.ScenarioAdjustment(department="Sales", percentage_change=0.1)
+
+    assert adjustment == scenario.ScenarioAdjustment(department="Sales", percentage_change=0.1)
+    assert adjustment.matches(("2024-01", "SALES", "Revenue", 1.0, "USD", ""))
+    with pytest.raises(AttributeError):
+        adjustment.department = "Marketing"  # type: ignore[misc]
+
+
+def test_fetch_dataset_returns_plain_tuples_with_float_values(sqlite_connection):
+    database.insert_rows(
+        sqlite_connection,
+        [("seed", "actual", "2024-01", "Sales", "Revenue", 1000, "USD", None)],
+    )
+
+    (row,) = scenario.fetch_dataset(sqlite_connection, "actual")
+
+    assert type(row) is tuple
+    assert row == ("2024-01", "Sales", "Revenue", 1000.0, "USD", "")
+    assert type(row[3]) is float
+
+
+def test_scenario_records_prefixes_provenance():
+    rows = [("2024-01", "Sales", "Revenue", 1.5, "USD", "")]
+
+    records = list(
+        scenario.scenario_records(rows, source_scenario="actual", target_scenario="plan")
+    )
+
+    assert records == [
+        ("scenario:actual", "plan", "2024-01", "Sales", "Revenue", 1.5, "USD", "")
+    ]
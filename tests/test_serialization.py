@@ -0,0 +1,42 @@
+import json
+
+import pytest
+
+from app import serialization
+
+
+@pytest.mark.parametrize("use_orjson", [True, False], ids=["orjson", "stdlib"])
+def test_dumps_returns_compact_utf8_json(monkeypatch: pytest.MonkeyPatch, use_orjson: bool):
+    if use_orjson:
+        if serialization.orjson is None:
+            pytest.skip("orjson is not installed")
+    else:
+        monkeypatch.setattr(serialization, "orjson", None)
+
+    payload = {"model": "demo", "messages": [{"content": "Café, 1000.5"}]}
+    encoded = serialization.dumps(payload)
+
+    assert isinstance(encoded, bytes)
+    assert json.loads(encoded.decode("utf-8")) == payload
+    assert b": " not in encoded
+
+
+@pytest.mark.parametrize("use_orjson", [True, False], ids=["orjson", "stdlib"])
+def test_dumps_indents_when_requested(monkeypatch: pytest.MonkeyPatch, use_orjson: bool):
+    if use_orjson:
+        if serialization.orjson is None:
+            pytest.skip("orjson is not installed")
+    else:
+        monkeypatch.setattr(serialization, "orjson", None)
+
+    encoded = serialization.dumps({"rows": [{"value": 1.5}]}, indent=True)
+
+    assert encoded.decode("utf-8") == json.dumps({"rows": [{"value": 1.5}]}, indent=2)
+
+
+@pytest.mark.parametrize("indent", [False, True], ids=["compact", "indented"])
+def test_stdlib_dumps_rejects_non_finite_floats(monkeypatch: pytest.MonkeyPatch, indent: bool):
+    monkeypatch.setattr(serialization, "orjson", None)
+
+    with pytest.raises(ValueError):
+        serialization.dumps({"a": float("nan")}, indent=indent)
@@ -0,0 +1,32 @@
+import pytest
+
+from app import settings
+
+
+@pytest.fixture(autouse=True)
+def _clear_defaults():
+    settings.ai_defaults.cache_clear()
+    yield
+    settings.ai_defaults.cache_clear()
+
+
+def test_ai_defaults_fall_back_to_builtins(monkeypatch: pytest.MonkeyPatch):
+    for name in (settings.API_BASE_ENV, settings.MODEL_ENV, settings.API_MODE_ENV):
+        monkeypatch.delenv(name, raising=False)
+
+    assert settings.ai_defaults() == settings.AIDefaults(
+        api_base=settings.DEFAULT_API_BASE,
+        model=settings.DEFAULT_MODEL,
+        mode=settings.DEFAULT_API_MODE,
+    )
+
+
+def test_ai_defaults_snapshot_environment_once(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setenv(settings.MODEL_ENV, "first-model")
+    assert settings.ai_defaults().model == "first-model"
+
+    monkeypatch.setenv(settings.MODEL_ENV, "second-model")
+    assert settings.ai_defaults().model == "first-model"
+
+    settings.ai_defaults.cache_clear()
+    assert settings.ai_defaults().model == "second-model"